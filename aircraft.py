@@ -230,28 +230,43 @@ class Aircraft2D:
             screen (pg.Surface): PyGame screen
             camera_pos (np.ndarray): camera position in world coordinates
         """
-        # Define local aircraft shape
-        length = 40
-        width = 20
-        points = np.array([
-            [length / 2, 0],
-            [- length / 2, -width / 2],
-            [- length / 2, width / 2]
-        ])
-        
-        # Rotate points based on pitch angle
-        cos_pitch, sin_pitch = np.cos(self.pitch), np.sin(self.pitch)
-        rot_matrix = np.array([[cos_pitch, -sin_pitch], [sin_pitch, cos_pitch]])
-        rotated_points = points @ rot_matrix.T
-        screen_points = [world_to_screen(self.pos + point, camera_pos, screen.get_size()) 
-                         for point in rotated_points]
-        
-        # Draw aircraft shape
-        pg.draw.polygon(screen, self.color, screen_points)
-        pg.draw.polygon(screen, (0, 0, 0), screen_points, width=2)
-
-        # Draw altitude
-        altitude_text = font.render(f'{self.pos[1]:.1f} m', True, (0, 0, 0, 0.1))
-        screen_pos = world_to_screen(self.pos + np.array([-length / 2, -
-            width]), camera_pos, screen.get_size())
-        screen.blit(altitude_text, (screen_pos[0], screen_pos[1] - 40))
+        draw_aircraft(screen, self.pos, self.pitch, self.color, camera_pos, font)
+
+
+def draw_aircraft(screen: pg.Surface, pos: np.ndarray, pitch: float, color: tuple[int, int, int],
+                  camera_pos: np.ndarray, font: pg.font.Font) -> None:
+    """Draw an aircraft on screen
+
+    Args:
+        screen (pg.Surface): PyGame screen
+        pos (np.ndarray): aircraft position [m]
+        pitch (float): aircraft pitch angle [rad]
+        color (tuple[int, int, int]): aircraft color
+        camera_pos (np.ndarray): camera position in world coordinates
+        font (pg.font.Font): font for the altitude label
+    """
+    # Define local aircraft shape
+    length = 40
+    width = 20
+    points = np.array([
+        [length / 2, 0],
+        [- length / 2, -width / 2],
+        [- length / 2, width / 2]
+    ])
+    
+    # Rotate points based on pitch angle
+    cos_pitch, sin_pitch = np.cos(pitch), np.sin(pitch)
+    rot_matrix = np.array([[cos_pitch, -sin_pitch], [sin_pitch, cos_pitch]])
+    rotated_points = points @ rot_matrix.T
+    screen_points = [world_to_screen(pos + point, camera_pos, screen.get_size()) 
+                     for point in rotated_points]
+    
+    # Draw aircraft shape
+    pg.draw.polygon(screen, color, screen_points)
+    pg.draw.polygon(screen, (0, 0, 0), screen_points, width=2)
+
+    # Draw altitude
+    altitude_text = font.render(f'{pos[1]:.1f} m', True, (0, 0, 0, 0.1))
+    screen_pos = world_to_screen(pos + np.array([-length / 2, -
+        width]), camera_pos, screen.get_size())
+    screen.blit(altitude_text, (screen_pos[0], screen_pos[1] - 40))
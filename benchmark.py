@@ -0,0 +1,286 @@
+"""Throughput benchmarks of the simulation, inference, evaluation and GA hot paths"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from collections.abc import Callable
+
+from aircraft import Aircraft2D
+from controller import ControllerBank, ForwardBuffers
+from evaluate import evaluate_aircraft, evaluate_fleet
+from fleet import DEFAULT_CHUNK_SIZE, AircraftFleet
+from genetic import GeneticAlgorithm
+from scenario import Scenario, default_scenario
+from simulation import DEFAULT_DT, run_episode
+
+
+SIZES = (50, 500, 5000, 50000)
+EPISODE_TIMES = (10.0, 30.0)
+SCALAR_MAX_SIZE = 5000  # per-aircraft (scalar) code is only measured up to this population size
+
+# A benchmark setup creates its inputs and returns the code to time, the work done per call and the
+# unit of work
+Setup = Callable[[Scenario, int], tuple[Callable[[], object], float, str]]
+
+
+def _flying_fleet(scenario: Scenario, size: int, episode_time: float = 5.0) -> AircraftFleet:
+    """Fly a random population for a short episode, to get a realistic mix of fleet states
+
+    Args:
+        scenario (Scenario): scenario to fly in
+        size (int): number of aircraft
+        episode_time (float, optional): simulated time [s]. Defaults to 5.0.
+
+    Returns:
+        AircraftFleet: fleet after the episode
+    """
+    return run_episode(ControllerBank.random(size), scenario, episode_time)
+
+
+def aircraft_step(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Step a list of Aircraft2D (per-aircraft physics)"""
+    aircraft = [Aircraft2D(scenario.config, scenario.environment, scenario.terrain)
+                for _ in range(size)]
+    for ac in aircraft:
+        ac.thrust_setting = 1.0
+
+    def run() -> None:
+        for ac in aircraft:
+            ac.crashed = False  # keep the work per step constant
+            ac.step(DEFAULT_DT)
+    return run, size, 'steps/s'
+
+
+def fleet_step(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Step an AircraftFleet (vectorized physics)"""
+    fleet = AircraftFleet(scenario.config, scenario.environment, scenario.terrain, size)
+    fleet.thrust_setting = np.ones(size)
+    everyone = np.arange(size)
+
+    def run() -> None:
+        fleet.active = everyone  # keep the work per step constant
+        fleet.step(DEFAULT_DT)
+    return run, size, 'steps/s'
+
+
+def controller_forward(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Run Controller.forward for each controller of a population"""
+    controllers = ControllerBank.random(size).to_controllers()
+    states = np.random.randn(size, 6)
+
+    def run() -> None:
+        for controller, state in zip(controllers, states):
+            controller.forward(state)
+    return run, size, 'forwards/s'
+
+
+def bank_forward(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Run a batched ControllerBank.forward over a population"""
+    bank = ControllerBank.random(size)
+    states = np.random.randn(size, 6)
+    return lambda: bank.forward(states), size, 'forwards/s'
+
+
+def bank_forward_chunks(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Run ControllerBank.forward_chunk over a population in chunks (as in an episode)"""
+    bank = ControllerBank.random(size)
+    states = np.random.randn(size, 6)
+    buffers = ForwardBuffers(min(DEFAULT_CHUNK_SIZE, size))
+
+    def run() -> None:
+        for start in range(0, size, DEFAULT_CHUNK_SIZE):
+            rows = slice(start, start + DEFAULT_CHUNK_SIZE)
+            bank.forward_chunk(states[rows], rows, buffers)
+    return run, size, 'forwards/s'
+
+
+def aircraft_evaluate(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Score a population with evaluate_aircraft"""
+    aircraft = list(_flying_fleet(scenario, size))
+    return lambda: [evaluate_aircraft(ac, scenario.terrain) for ac in aircraft], 1, 'generations/s'
+
+
+def fleet_evaluate(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Score a population with evaluate_fleet"""
+    fleet = _flying_fleet(scenario, size)
+    return lambda: evaluate_fleet(fleet, scenario.terrain), 1, 'generations/s'
+
+
+def next_generation(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+    """Breed the next generation of a population"""
+    ga = GeneticAlgorithm(population_size=size, elite_fraction=0.05, mutation_rate=0.09)
+    population = ControllerBank.random(size)
+    scores = np.random.rand(size)
+    return lambda: ga.next_generation(population, scores), 1, 'generations/s'
+
+
+def episode(episode_time: float) -> Setup:
+    """Create the setup of a full headless episode benchmark
+
+    Args:
+        episode_time (float): simulated episode duration [s]
+
+    Returns:
+        Setup: benchmark setup
+    """
+    def setup(scenario: Scenario, size: int) -> tuple[Callable[[], object], float, str]:
+        bank = ControllerBank.random(size)
+        # The episode ends early once every aircraft has landed or crashed, so the simulated time
+        # is the number of steps flown (the same for every call) times the timestep
+        simulated_time = run_episode(bank, scenario, episode_time).steps.max() * DEFAULT_DT
+        return lambda: run_episode(bank, scenario, episode_time), simulated_time, 'sim-s/s'
+    return setup
+
+
+def benchmarks(episode_times: tuple[float, ...] = EPISODE_TIMES) -> dict[str, tuple[Setup, bool]]:
+    """Get all benchmarks
+
+    Args:
+        episode_times (tuple[float, ...], optional): episode durations of the episode benchmarks [s].
+            Defaults to EPISODE_TIMES.
+
+    Returns:
+        dict[str, tuple[Setup, bool]]: setup per benchmark name, and whether it runs scalar code
+    """
+    suite = {
+        'Aircraft2D.step': (aircraft_step, True),
+        'AircraftFleet.step': (fleet_step, False),
+        'Controller.forward': (controller_forward, True),
+        'ControllerBank.forward': (bank_forward, False),
+        'ControllerBank.forward_chunk': (bank_forward_chunks, False),
+        'evaluate_aircraft': (aircraft_evaluate, True),
+        'evaluate_fleet': (fleet_evaluate, False),
+        'GeneticAlgorithm.next_generation': (next_generation, False),
+    }
+    for episode_time in episode_times:
+        suite[f'episode[{episode_time:g}s]'] = (episode(episode_time), False)
+    return suite
+
+
+def measure(run: Callable[[], object], min_time: float, repeats: int = 3) -> float:
+    """Measure the number of calls per second (best of several repeats)
+
+    Args:
+        run (Callable[[], object]): code to time
+        min_time (float): minimum duration of each repeat [s]
+        repeats (int, optional): number of repeats. Defaults to 3.
+
+    Returns:
+        float: calls per second
+    """
+    run()  # warm up
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            run()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def run_benchmarks(sizes: tuple[int, ...] = SIZES,
+                   episode_times: tuple[float, ...] = EPISODE_TIMES,
+                   only: list[str] | None = None,
+                   min_time: float = 0.2,
+                   seed: int = 1) -> dict[str, dict]:
+    """Run the benchmarks for each population size
+
+    Args:
+        sizes (tuple[int, ...], optional): population sizes. Defaults to SIZES.
+        episode_times (tuple[float, ...], optional): episode durations [s]. Defaults to
+            EPISODE_TIMES.
+        only (list[str] | None, optional): only run benchmarks whose name contains one of these
+            (case-insensitive). Defaults to None (run all).
+        min_time (float, optional): minimum duration of each measurement [s]. Defaults to 0.2.
+        seed (int, optional): random seed. Defaults to 1.
+
+    Returns:
+        dict[str, dict]: result per benchmark and size (name, size, rate and unit)
+    """
+    scenario = default_scenario()
+    results = {}
+    for name, (setup, scalar) in benchmarks(episode_times).items():
+        if only and not any(pattern.lower() in name.lower() for pattern in only):
+            continue
+        for size in sizes:
+            if scalar and size > SCALAR_MAX_SIZE:
+                continue
+            np.random.seed(seed)
+            run, work, unit = setup(scenario, size)
+            rate = work * measure(run, min_time)
+            key = f'{name}[n={size}]'
+            results[key] = {'name': name, 'size': size, 'rate': rate, 'unit': unit}
+            print(f'{key:48s} {rate:14.1f} {unit}', flush=True)
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict],
+            tolerance: float) -> list[str]:
+    """Compare results with a baseline
+
+    Args:
+        results (dict[str, dict]): benchmark results
+        baseline (dict[str, dict]): baseline results
+        tolerance (float): allowed relative slowdown before a result counts as a regression
+
+    Returns:
+        list[str]: keys of the benchmarks that regressed
+    """
+    regressions = []
+    print(f'\n{"benchmark":48s} {"baseline":>14s} {"current":>14s} {"change":>8s}')
+    for key, result in results.items():
+        if key not in baseline:
+            print(f'{key:48s} {"-":>14s} {result["rate"]:14.1f} {"new":>8s}')
+            continue
+        change = result['rate'] / baseline[key]['rate'] - 1
+        regressed = change < -tolerance
+        if regressed:
+            regressions.append(key)
+        print(f'{key:48s} {baseline[key]["rate"]:14.1f} {result["rate"]:14.1f} {change:+8.1%}'
+              f'{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark simulation and training throughput')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='population sizes')
+    parser.add_argument('--episode-times', type=float, nargs='+', default=EPISODE_TIMES,
+                        help='episode durations of the episode benchmarks [s]')
+    parser.add_argument('--only', nargs='+', default=None,
+                        help='only run benchmarks whose name contains one of these strings '
+                             '(case-insensitive)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum duration of each measurement [s]')
+    parser.add_argument('--baseline', default=None, help='baseline JSON file to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed relative slowdown compared to the baseline')
+    parser.add_argument('--save', default=None, help='save the results as a baseline JSON file')
+    args = parser.parse_args()
+
+    results = run_benchmarks(tuple(args.sizes), tuple(args.episode_times), args.only, args.min_time)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__,
+                       'machine': platform.machine(), 'results': results}, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} benchmark(s) slower than the baseline')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Fitness caching"""
+import hashlib
+import numpy as np
+
+from collections import OrderedDict
+
+from scenario import Scenario, ScenarioBatch
+
+
+def _parameters(scenario: Scenario) -> tuple:
+    """Get the scenario parameters that influence a score
+
+    Args:
+        scenario (Scenario): scenario
+
+    Returns:
+        tuple: parameters
+    """
+    terrain = scenario.terrain
+    return (scenario.config, scenario.environment,
+            terrain.oceans, terrain.runways, terrain.mountains)
+
+
+def scenario_key(scenario: Scenario | ScenarioBatch) -> bytes:
+    """Fingerprint of the scenario parameters that influence a score
+
+    Args:
+        scenario (Scenario | ScenarioBatch): scenario (or scenario batch)
+
+    Returns:
+        bytes: fingerprint (equal for scenarios with equal parameters)
+    """
+    if isinstance(scenario, ScenarioBatch):
+        parameters = ([_parameters(s) for s in scenario.scenarios],
+                      scenario.aggregation, scenario.quantile)
+    else:
+        parameters = _parameters(scenario)
+    return hashlib.blake2b(repr(parameters).encode(), digest_size=16).digest()
+
+
+class FitnessCache:
+    """Scores of previously simulated controllers, with least-recently-used eviction
+
+    Entries are keyed by a hash of the controller parameters together with everything else that
+    determines the outcome of a (deterministic) episode, like the episode time, timestep and
+    scenario. Elites that are carried over unchanged then do not need to be simulated again.
+    """
+
+    def __init__(self, max_size: int = 100000) -> None:
+        """Create an empty cache
+
+        Args:
+            max_size (int, optional): maximum number of entries. Defaults to 100000.
+        """
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[bytes, tuple[float, bool]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self, params: np.ndarray, context: tuple) -> list[bytes]:
+        """Compute the cache keys of a set of controllers
+
+        Args:
+            params (np.ndarray): (n, n_params) controller parameters
+            context (tuple): other parameters that influence the score (compared by their repr)
+
+        Returns:
+            list[bytes]: key per controller
+        """
+        context_bytes = repr(context).encode()
+        params = np.ascontiguousarray(params)
+        return [hashlib.blake2b(row.tobytes() + context_bytes, digest_size=16).digest()
+                for row in params]
+
+    def lookup(self, keys: list[bytes]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Look up the scores of a set of controllers
+
+        Args:
+            keys (list[bytes]): cache keys
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: whether each key was found, scores and
+                landed flags (only valid where found)
+        """
+        found = np.zeros(len(keys), dtype=bool)
+        scores = np.zeros(len(keys))
+        landed = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys):
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                found[i] = True
+                scores[i], landed[i] = entry
+        self.hits += int(found.sum())
+        self.misses += len(keys) - int(found.sum())
+        return found, scores, landed
+
+    def store(self, keys: list[bytes], scores: np.ndarray, landed: np.ndarray) -> None:
+        """Store the scores of a set of controllers
+
+        Args:
+            keys (list[bytes]): cache keys
+            scores (np.ndarray): score per controller
+            landed (np.ndarray): whether each aircraft landed
+        """
+        for key, score, has_landed in zip(keys, scores, landed):
+            self._entries[key] = (float(score), bool(has_landed))
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -69,3 +69,310 @@ class Controller:
         controller.w2 = data['w2']
         controller.b2 = data['b2']
         return controller
+
+    @classmethod
+    def from_weights(cls, w1: np.ndarray, b1: np.ndarray,
+                     w2: np.ndarray, b2: np.ndarray) -> "Controller":
+        """Create a controller from existing weights, without drawing random weights
+
+        Args:
+            w1 (np.ndarray): input to hidden layer weights
+            b1 (np.ndarray): hidden layer biases
+            w2 (np.ndarray): hidden to output layer weights
+            b2 (np.ndarray): output layer biases
+
+        Returns:
+            Controller: controller using the given weight arrays
+        """
+        controller = cls.__new__(cls)
+        controller.w1 = w1
+        controller.b1 = b1
+        controller.w2 = w2
+        controller.b2 = b2
+        return controller
+
+
+class ForwardBuffers:
+    """Preallocated arrays for feedforward passes over chunks of a controller bank
+
+    The buffers are reused by every chunk of every step, so inference does not allocate memory and
+    its working set stays the size of one chunk, however large the population is.
+    """
+
+    def __init__(self, chunk_size: int, input_size: int = 6, hidden_size: int = 8,
+                 output_size: int = 3, dtype: np.dtype = np.float64) -> None:
+        """Allocate the buffers
+
+        Args:
+            chunk_size (int): maximum number of controllers per pass
+            input_size (int, optional): input layer size. Defaults to 6.
+            hidden_size (int, optional): hidden layer size. Defaults to 8.
+            output_size (int, optional): output layer size. Defaults to 3.
+            dtype (np.dtype, optional): floating point type of the controller parameters.
+                Defaults to np.float64.
+        """
+        self.chunk_size: int = chunk_size
+        self.inputs: np.ndarray = np.empty((chunk_size, input_size), dtype)       # states
+        self.hidden: np.ndarray = np.empty((chunk_size, 1, hidden_size), dtype)   # activations
+        self.outputs: np.ndarray = np.empty((chunk_size, 1, output_size), dtype)  # activations
+        self.commands: np.ndarray = np.empty((output_size, chunk_size), dtype)    # scaled outputs
+
+
+class ControllerBank:
+    """Population of feedforward neural network controllers evaluated in a single batch
+
+    All parameters are stored in one contiguous (n, n_params) matrix, one row per controller
+    (w1, b1, w2 and b2 flattened in that order). The weight arrays are views into this matrix, so
+    creating, copying and mutating controllers are row operations.
+    """
+
+    def __init__(self, params: np.ndarray, input_size: int = 6, hidden_size: int = 8,
+                 output_size: int = 3) -> None:
+        """Create a controller bank from a parameter matrix
+
+        Args:
+            params (np.ndarray): (n, n_params) parameters, one row per controller
+            input_size (int, optional): input layer size. Defaults to 6.
+            hidden_size (int, optional): hidden layer size. Defaults to 8.
+            output_size (int, optional): output layer size. Defaults to 3.
+        """
+        self.input_size: int = input_size
+        self.hidden_size: int = hidden_size
+        self.output_size: int = output_size
+        if params.ndim != 2 or params.shape[1] != self.param_count(input_size, hidden_size,
+                                                                   output_size):
+            raise ValueError(f'Parameter matrix has shape {params.shape}, expected '
+                             f'(n, {self.param_count(input_size, hidden_size, output_size)})')
+        self.params: np.ndarray = params
+
+        # Weight views into the parameter matrix
+        n = len(params)
+        end_w1 = input_size * hidden_size
+        end_b1 = end_w1 + hidden_size
+        end_w2 = end_b1 + hidden_size * output_size
+        self.w1: np.ndarray = params[:, :end_w1].reshape(n, input_size, hidden_size)
+        self.b1: np.ndarray = params[:, end_w1:end_b1]
+        self.w2: np.ndarray = params[:, end_b1:end_w2].reshape(n, hidden_size, output_size)
+        self.b2: np.ndarray = params[:, end_w2:]
+
+    @staticmethod
+    def param_count(input_size: int, hidden_size: int, output_size: int) -> int:
+        """Number of parameters of a single controller
+
+        Args:
+            input_size (int): input layer size
+            hidden_size (int): hidden layer size
+            output_size (int): output layer size
+
+        Returns:
+            int: number of weights and biases
+        """
+        return (input_size + 1) * hidden_size + (hidden_size + 1) * output_size
+
+    @property
+    def n_params(self) -> int:
+        """Get the number of parameters per controller
+
+        Returns:
+            int: number of weights and biases
+        """
+        return self.params.shape[1]
+
+    @property
+    def sizes(self) -> tuple[int, int, int]:
+        """Get the layer sizes
+
+        Returns:
+            tuple[int, int, int]: input, hidden and output layer size
+        """
+        return self.input_size, self.hidden_size, self.output_size
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    def __getstate__(self) -> dict:
+        # Only send the parameter matrix (the weight arrays are views into it)
+        return {'params': self.params, 'input_size': self.input_size,
+                'hidden_size': self.hidden_size, 'output_size': self.output_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def __getitem__(self, index: int) -> Controller:
+        """Get a single controller, sharing its weights with the bank
+
+        Args:
+            index (int): controller index
+
+        Returns:
+            Controller: controller with weight views into the bank
+        """
+        return Controller.from_weights(self.w1[index], self.b1[index],
+                                       self.w2[index], self.b2[index])
+
+    def subset(self, indices: slice | np.ndarray) -> "ControllerBank":
+        """Get a bank with a subset of the controllers
+
+        Args:
+            indices (slice | np.ndarray): controller indices (a slice shares weights with this bank)
+
+        Returns:
+            ControllerBank: controller bank
+        """
+        return ControllerBank(self.params[indices], *self.sizes)
+
+    def copy(self) -> "ControllerBank":
+        """Copy the bank
+
+        Returns:
+            ControllerBank: controller bank with its own parameter matrix
+        """
+        return ControllerBank(self.params.copy(), *self.sizes)
+
+    def astype(self, dtype: np.dtype) -> "ControllerBank":
+        """Convert the bank to another floating point type
+
+        Args:
+            dtype (np.dtype): floating point type of the parameters
+
+        Returns:
+            ControllerBank: controller bank with its own parameter matrix
+        """
+        return ControllerBank(self.params.astype(dtype), *self.sizes)
+
+    def mutate(self, rate: float = 0.1, indices: slice | np.ndarray = slice(None)) -> None:
+        """Mutate the weights of (a subset of) the controllers in place
+
+        Draws the same random numbers as calling Controller.mutate on each controller in order.
+
+        Args:
+            rate (float, optional): mutation rate. Defaults to 0.1.
+            indices (slice | np.ndarray, optional): controllers to mutate. Defaults to all.
+        """
+        rows = np.arange(len(self))[indices]
+        self.params[rows] += rate * np.random.randn(len(rows), self.n_params)
+
+    @classmethod
+    def random(cls, size: int, input_size: int = 6, hidden_size: int = 8,
+               output_size: int = 3, dtype: np.dtype = np.float64) -> "ControllerBank":
+        """Create a bank of controllers with random weights
+
+        Draws the same random numbers as creating the controllers one by one with Controller().
+        The precision of the parameters carries over to the populations bred from the bank and to
+        the fleets that fly it.
+
+        Args:
+            size (int): number of controllers
+            input_size (int, optional): input layer size. Defaults to 6.
+            hidden_size (int, optional): hidden layer size. Defaults to 8.
+            output_size (int, optional): output layer size. Defaults to 3.
+            dtype (np.dtype, optional): floating point type of the parameters.
+                Defaults to np.float64.
+
+        Returns:
+            ControllerBank: controller bank
+        """
+        params = np.zeros((size, cls.param_count(input_size, hidden_size, output_size)), dtype)
+        params[:, :-output_size] = np.random.randn(size, params.shape[1] - output_size)
+        return cls(params, input_size, hidden_size, output_size)
+
+    @classmethod
+    def from_controllers(cls, controllers: list[Controller]) -> "ControllerBank":
+        """Copy the weights of a list of controllers into a bank
+
+        Args:
+            controllers (list[Controller]): controllers with equal layer sizes
+
+        Returns:
+            ControllerBank: controller bank
+        """
+        input_size, hidden_size = controllers[0].w1.shape
+        output_size = controllers[0].w2.shape[1]
+        params = np.stack([np.concatenate((c.w1.ravel(), c.b1, c.w2.ravel(), c.b2))
+                           for c in controllers])
+        return cls(params, input_size, hidden_size, output_size)
+
+    def to_controllers(self) -> list[Controller]:
+        """Split the bank into independent controllers
+
+        Returns:
+            list[Controller]: copies of each controller
+        """
+        return [Controller.from_weights(w1.copy(), b1.copy(), w2.copy(), b2.copy())
+                for w1, b1, w2, b2 in zip(self.w1, self.b1, self.w2, self.b2)]
+
+    def forward(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Batched feedforward pass, one state (or batch of states) per controller
+
+        Args:
+            x (np.ndarray): (n, input_size) or (n, k, input_size) state inputs
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: thrust commands [0,1],
+                                                       control surface commands [-1,1],
+                                                       wheel brake commands [0,1]
+        """
+        batch = x.reshape(len(self), -1, x.shape[-1])
+        hidden = np.tanh(batch @ self.w1 + self.b1[:, None, :])
+        out = np.tanh(hidden @ self.w2 + self.b2[:, None, :])
+        out = out.reshape(*x.shape[:-1], out.shape[-1])
+        return (out[..., 0] + 1) / 2, out[..., 1], (out[..., 2] + 1) / 2
+
+    def forward_chunk(self, x: np.ndarray, rows: slice,
+                      buffers: ForwardBuffers) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Batched feedforward pass of a chunk of controllers, computed in preallocated buffers
+
+        Gives the same commands as forward on the same controllers.
+
+        Args:
+            x (np.ndarray): (n, input_size) state inputs (may be buffers.inputs[:n])
+            rows (slice): contiguous range of n controllers, n at most buffers.chunk_size
+            buffers (ForwardBuffers): buffers to compute in
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: thrust commands [0,1],
+                                                       control surface commands [-1,1],
+                                                       wheel brake commands [0,1]
+                                                       (views into the buffers, valid until the
+                                                       next pass)
+        """
+        n = len(x)
+        hidden = buffers.hidden[:n]
+        np.matmul(x[:, None, :], self.w1[rows], out=hidden)
+        hidden += self.b1[rows, None, :]
+        np.tanh(hidden, out=hidden)
+        out = buffers.outputs[:n]
+        np.matmul(hidden, self.w2[rows], out=out)
+        out += self.b2[rows, None, :]
+        np.tanh(out, out=out)
+
+        thrust, control_surface, wheel_brake = buffers.commands[:, :n]
+        np.add(out[:, 0, 0], 1, out=thrust)
+        thrust /= 2
+        control_surface[:] = out[:, 0, 1]
+        np.add(out[:, 0, 2], 1, out=wheel_brake)
+        wheel_brake /= 2
+        return thrust, control_surface, wheel_brake
+
+    def save(self, filename: str, index: int) -> None:
+        """Save the weights of a single controller to a file (same format as Controller.save)
+
+        Args:
+            filename (str): name of the file
+            index (int): controller index
+        """
+        self[index].save(filename)
+
+    @classmethod
+    def load(cls, filenames: list[str]) -> "ControllerBank":
+        """Load a controller bank from per-controller weight files
+
+        Args:
+            filenames (list[str]): names of the files, one per controller
+
+        Returns:
+            ControllerBank: loaded controller bank
+        """
+        weights = [np.load(filename) for filename in filenames]
+        return cls.from_controllers([Controller.from_weights(w['w1'], w['b1'], w['w2'], w['b2'])
+                                     for w in weights])
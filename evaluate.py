@@ -2,7 +2,8 @@
 import numpy as np
 
 from aircraft import Aircraft2D
-from terrain import Terrain
+from fleet import AircraftFleet, AircraftState
+from terrain import Terrain, TerrainBatch
 
 
 CRASH_PENALTY = 30000
@@ -12,11 +13,11 @@ LAND_BONUS = 10000
 PHASE_CAP = 20000
 
 
-def evaluate_aircraft(aircraft: Aircraft2D, terrain: Terrain) -> float:
+def evaluate_aircraft(aircraft: Aircraft2D | AircraftState, terrain: Terrain) -> float:
     """Evaluate the performance of an aircraft with a given controller
 
     Args:
-        aircraft (Aircraft2D): aircraft to evaluate
+        aircraft (Aircraft2D | AircraftState): aircraft to evaluate
         terrain (Terrain): terrain for the aircraft to fly over
 
     Returns:
@@ -89,6 +90,67 @@ def evaluate_aircraft(aircraft: Aircraft2D, terrain: Terrain) -> float:
     return score
 
 
+def evaluate_fleet(fleet: AircraftFleet,
+                   terrain: Terrain | TerrainBatch) -> np.ndarray[np.float64]:
+    """Evaluate the performance of all aircraft of a fleet at once
+
+    Gives the same scores as evaluate_aircraft for each aircraft: every phase is scored for all
+    aircraft with the same operations in the same order, and the phase of each aircraft selects its
+    score.
+
+    Args:
+        fleet (AircraftFleet): aircraft to evaluate
+        terrain (Terrain | TerrainBatch): terrain for the aircraft to fly over (or one terrain per
+            aircraft)
+
+    Returns:
+        np.ndarray[np.float64]: score per aircraft
+    """
+    x, y = fleet.pos[:, 0], fleet.pos[:, 1]
+    vx, vy = fleet.vel[:, 0], fleet.vel[:, 1]
+    on_ground = fleet.on_ground
+    approach_dist = 1200
+
+    # Determine flight phase (takeoff, cruise, approach, landing, overshoot)
+    bounds = [terrain.runways[0][1], terrain.runways[1][0] - approach_dist,
+              terrain.runways[1][0], terrain.runways[1][1]]
+    phase = np.sum([x >= bound for bound in bounds], axis=0)
+
+    # Calculate general penalties
+    score = np.zeros(len(x))
+    score -= np.where(fleet.crashed, CRASH_PENALTY, 0)
+    on_runway_end = (terrain.runways[1][1] - 10 < x) & (x < terrain.runways[1][1] + 10)
+    score += np.where(fleet.crashed & on_runway_end, CRASH_PENALTY, 0)
+    score -= np.where(fleet.stalled, STALL_PENALTY, 0)
+
+    # Takeoff
+    takeoff_score = np.where(on_ground, 0.0, TAKEOFF_BONUS)
+    takeoff_score -= np.where(on_ground, 0.0, np.abs(y - 50.0) * 5.0)
+    takeoff_score -= np.maximum(0.0, 20.0 - vx) * 20.0
+
+    # Cruise
+    cruise_score = 2.0 * vx
+    cruise_score -= np.abs(y - 100.0) * 5.0
+    cruise_score -= np.abs(vy - 90) * 2
+
+    # Approach
+    target_alt = (terrain.runways[1][0] - x) / approach_dist * 200
+    approach_score = -(np.abs(y - target_alt) * 10.0)
+
+    # Landing
+    landing_score = np.where(on_ground, -(np.abs(vx) * 20.0),
+                             -1000.0 - y * 100.0 - np.abs(terrain.runways[1][0] - x))
+
+    # Phase-specific scoring
+    score += np.choose(phase, [0, PHASE_CAP, 2 * PHASE_CAP, 3 * PHASE_CAP, 0])
+    score += np.where((phase == 3) & on_ground, LAND_BONUS, 0)
+    phase_score = np.choose(np.minimum(phase, 3),
+                            [takeoff_score, cruise_score, approach_score, landing_score])
+    score += np.where(phase < 4, np.clip(phase_score, -PHASE_CAP, PHASE_CAP), 0)
+    score -= np.where(phase == 4, 20000 + 50 * (x - terrain.runways[1][1]), 0)
+    return score
+
+
     # # Reach target position (and stop there)
     # score -= abs(target_x - x)
 
@@ -0,0 +1,762 @@
+"""Vectorized 2D aircraft fleet model"""
+import numpy as np
+
+from dataclasses import dataclass, fields, replace
+
+from aircraft import AircraftConfig
+from environment import Environment
+from integrators import INTEGRATORS, locate_event, rk4_adaptive, rk4_step
+from scenario import ScenarioBatch
+from terrain import Terrain, TerrainBatch
+
+
+# Controller input normalization of [x, y, vx, vy, pitch, pitch rate]
+STATE_SCALE = np.array([7400, 200, 150, 20, 1, 1])
+
+# Number of aircraft stepped at a time: keeps the temporary arrays of a step in the CPU cache
+DEFAULT_CHUNK_SIZE = 4096
+
+
+@dataclass
+class AircraftState:
+    """Snapshot of a single aircraft in a fleet"""
+    pos: np.ndarray               # [m] position
+    vel: np.ndarray               # [m/s] velocity
+    pitch: float                  # [rad] pitch angle
+    pitch_rate: float             # [rad/s] pitch rate
+    thrust_setting: float         # [-] thrust setting (0.0 to 1.0)
+    control_surface_angle: float  # [rad] flap angle
+    wheel_brake: float            # [-] wheel brake setting (0.0 to 1.0)
+    stalled: bool
+    on_ground: bool
+    crashed: bool
+
+
+def _norm(vectors: np.ndarray) -> np.ndarray:
+    """Calculate the norm of each row vector
+
+    Uses the same dot product kernel as np.linalg.norm on a single vector, so that results are
+    bit-identical to the per-aircraft model.
+
+    Args:
+        vectors (np.ndarray): (n, 2) array of vectors
+
+    Returns:
+        np.ndarray: (n,) array of norms
+    """
+    return np.sqrt((vectors[:, None, :] @ vectors[:, :, None])[:, 0, 0])
+
+
+def _column(value: float | np.ndarray) -> float | np.ndarray:
+    """Shape a shared (scalar) or per-aircraft (n,) parameter to broadcast against (n, 2) arrays
+
+    Args:
+        value (float | np.ndarray): parameter value(s)
+
+    Returns:
+        float | np.ndarray: (n, 1) array for per-aircraft values, scalar otherwise
+    """
+    return value[:, None] if np.ndim(value) > 0 else value
+
+
+def _square(values: np.ndarray) -> np.ndarray:
+    """Square each value in the precision of the array
+
+    In float64, float_power matches scalar ** exactly (whereas array ** 2 is computed as x * x),
+    so results stay bit-identical to the per-aircraft model. float_power always computes in
+    float64 though, so other precisions use a plain square.
+
+    Args:
+        values (np.ndarray): values
+
+    Returns:
+        np.ndarray: squared values
+    """
+    if values.dtype == np.float64:
+        return np.float_power(values, 2)
+    return np.square(values)
+
+
+def _cast(parameters: AircraftConfig | Environment,
+          dtype: np.dtype) -> AircraftConfig | Environment:
+    """Convert the (shared or per-aircraft) values of a parameter set to a floating point type
+
+    Args:
+        parameters (AircraftConfig | Environment): parameters
+        dtype (np.dtype): floating point type
+
+    Returns:
+        AircraftConfig | Environment: parameters with values of the given type (the same object
+            for float64)
+    """
+    if dtype == np.float64:
+        return parameters
+    return replace(parameters, **{field.name: np.asarray(getattr(parameters, field.name), dtype)[()]
+                                  for field in fields(parameters)})
+
+
+# Aircraft, environment and terrain parameters of a set of aircraft
+Parameters = tuple[AircraftConfig, Environment, Terrain | TerrainBatch]
+
+
+def _select(parameters: AircraftConfig | Environment,
+            aircraft: np.ndarray | slice) -> AircraftConfig | Environment:
+    """Get the values of a subset of the aircraft from a per-aircraft parameter set
+
+    Args:
+        parameters (AircraftConfig | Environment): parameters with one value per aircraft (or one
+            shared value)
+        aircraft (np.ndarray | slice): indices of the aircraft
+
+    Returns:
+        AircraftConfig | Environment: parameters of the subset
+    """
+    values = {field.name: getattr(parameters, field.name) for field in fields(parameters)}
+    return replace(parameters, **{name: value[aircraft] for name, value in values.items()
+                                  if isinstance(value, np.ndarray)})
+
+
+class AircraftFleet:
+    """Population of 2D aircraft simulated as contiguous arrays
+
+    Implements the same physics as Aircraft2D, but advances all aircraft in a single vectorized step.
+    With the 'euler' integrator, steps are identical to Aircraft2D. The 'rk4' and 'adaptive'
+    integrators treat the step as a continuous flight with constant controls, and locate touchdown,
+    crash and runway overrun events within the step.
+
+    A fleet created with from_scenarios flies every aircraft in its own scenario: the aircraft,
+    environment and terrain parameters then have one value per aircraft. They are built once, and
+    a step only selects those of the aircraft it processes.
+
+    Aircraft are independent, so a step processes the active aircraft in chunks of chunk_size. The
+    temporary arrays of a step then stay the size of a chunk, which keeps them in the CPU cache
+    for very large fleets, and the result does not depend on the chunk size.
+    """
+
+    MAX_EVENTS = 3  # maximum number of events handled per aircraft per step
+
+    def __init__(self, config: AircraftConfig, environment: Environment, terrain: Terrain,
+                 size: int, integrator: str = 'euler', tolerance: float = 1e-6,
+                 dtype: np.dtype = np.float64, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """Initialize a fleet of aircraft at rest at the origin
+
+        Args:
+            config (AircraftConfig): aircraft parameters
+            environment (Environment): environment parameters
+            terrain (Terrain): terrain parameters
+            size (int): number of aircraft
+            integrator (str, optional): 'euler' (semi-implicit Euler, as Aircraft2D), 'rk4' or
+                'adaptive' (RK4 with step doubling). Defaults to 'euler'.
+            tolerance (float, optional): local error tolerance of the adaptive integrator.
+                Defaults to 1e-6.
+            dtype (np.dtype, optional): floating point type of the state and parameters
+                (np.float32 halves the memory traffic, at the cost of precision). Defaults to
+                np.float64.
+            chunk_size (int, optional): number of aircraft stepped at a time.
+                Defaults to DEFAULT_CHUNK_SIZE.
+        """
+        if integrator not in INTEGRATORS:
+            raise ValueError(f'Unknown integrator {integrator!r}, choose from {INTEGRATORS}')
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.config: AircraftConfig = _cast(config, self.dtype)
+        self.environment: Environment = _cast(environment, self.dtype)
+        self.terrain: Terrain | TerrainBatch = terrain
+        self.scenarios: ScenarioBatch | None = None  # scenarios of per-aircraft parameters
+        self.scenario_ids: np.ndarray | None = None  # scenario index per aircraft
+        self.size: int = size
+        self.integrator: str = integrator
+        self.tolerance: float = tolerance
+        self.chunk_size: int = chunk_size
+        # [s] adaptive integrator step sizes
+        self.step_size: np.ndarray = np.full(size, np.inf, self.dtype)
+
+        # Separate generator, so colors do not consume the global random state
+        self.colors: np.ndarray = np.random.default_rng().integers(0, 256, size=(size, 3))
+
+        # State variables
+        self._thrust: np.ndarray = np.zeros(size, self.dtype)                 # [-] thrust setting
+        self._control_surface_angle: np.ndarray = np.zeros(size, self.dtype)  # [rad] flap angle
+        self._wheel_brake: np.ndarray = np.zeros(size, self.dtype)            # [-] brake setting
+        self.pos: np.ndarray = np.zeros((size, 2), self.dtype)                # [m] position
+        self.vel: np.ndarray = np.zeros((size, 2), self.dtype)                # [m/s] velocity
+        self.pitch: np.ndarray = np.zeros(size, self.dtype)                   # [rad] pitch angle
+        self.pitch_rate: np.ndarray = np.zeros(size, self.dtype)              # [rad/s] pitch rate
+        self.stalled: np.ndarray = np.zeros(size, dtype=bool)
+        self.on_ground: np.ndarray = np.ones(size, dtype=bool)
+        self.crashed: np.ndarray = np.zeros(size, dtype=bool)
+
+        # Indices of aircraft that have neither crashed nor landed (the only ones still simulated)
+        self.active: np.ndarray = np.arange(size)
+
+        # Number of steps performed by the fleet and simulated per aircraft
+        self.step_count: int = 0
+        self.steps: np.ndarray = np.zeros(size, dtype=int)
+
+        # Whether each active aircraft stays active after a step (reused every step)
+        self._keep: np.ndarray = np.empty(size, dtype=bool)
+
+        # Controller input normalization in the fleet precision
+        self._state_scale: np.ndarray = STATE_SCALE if self.dtype == np.float64 \
+            else STATE_SCALE.astype(self.dtype)
+
+    @classmethod
+    def from_scenarios(cls, scenarios: ScenarioBatch, size: int, integrator: str = 'euler',
+                       tolerance: float = 1e-6, dtype: np.dtype = np.float64,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> "AircraftFleet":
+        """Create a fleet that flies size aircraft in each scenario of a batch (scenario-major)
+
+        Args:
+            scenarios (ScenarioBatch): scenarios
+            size (int): number of aircraft per scenario
+            integrator (str, optional): integrator. Defaults to 'euler'.
+            tolerance (float, optional): local error tolerance of the adaptive integrator.
+                Defaults to 1e-6.
+            dtype (np.dtype, optional): floating point type. Defaults to np.float64.
+            chunk_size (int, optional): number of aircraft stepped at a time.
+                Defaults to DEFAULT_CHUNK_SIZE.
+
+        Returns:
+            AircraftFleet: fleet of len(scenarios) * size aircraft
+        """
+        ids = np.repeat(np.arange(len(scenarios)), size)
+        fleet = cls(*scenarios.parameters(ids), len(ids), integrator, tolerance, dtype, chunk_size)
+        fleet.scenarios = scenarios
+        fleet.scenario_ids = ids
+        return fleet
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> AircraftState:
+        """Get a snapshot of a single aircraft
+
+        Args:
+            index (int): aircraft index
+
+        Returns:
+            AircraftState: aircraft state
+        """
+        if not -self.size <= index < self.size:
+            raise IndexError('aircraft index out of range')
+        return AircraftState(
+            pos=self.pos[index].copy(),
+            vel=self.vel[index].copy(),
+            pitch=self.pitch[index],
+            pitch_rate=self.pitch_rate[index],
+            thrust_setting=self._thrust[index],
+            control_surface_angle=self._control_surface_angle[index],
+            wheel_brake=self._wheel_brake[index],
+            stalled=self.stalled[index],
+            on_ground=self.on_ground[index],
+            crashed=self.crashed[index]
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(self.size))
+
+    @property
+    def thrust_setting(self) -> np.ndarray:
+        """Get or set the thrust settings of the aircraft in range [0.0, 1.0]
+
+        Returns:
+            np.ndarray: thrust settings [-]
+        """
+        return self._thrust
+
+    @thrust_setting.setter
+    def thrust_setting(self, value: np.ndarray) -> None:
+        self._thrust[:] = np.clip(value, 0.0, 1.0)
+
+    @property
+    def control_surface_angle(self) -> np.ndarray:
+        """Get or set the control surface angles of the aircraft in range [-max_angle, max_angle]
+
+        Returns:
+            np.ndarray: control surface angles [rad]
+        """
+        return self._control_surface_angle
+
+    @control_surface_angle.setter
+    def control_surface_angle(self, value: np.ndarray) -> None:
+        max_angle = self.config.max_control_surface_angle
+        self._control_surface_angle[:] = np.clip(value, -max_angle, max_angle)
+
+    @property
+    def wheel_brake(self) -> np.ndarray:
+        """Get or set the wheel brake settings of the aircraft
+
+        Returns:
+            np.ndarray: wheel brake settings [-]
+        """
+        return self._wheel_brake
+
+    @wheel_brake.setter
+    def wheel_brake(self, value: np.ndarray) -> None:
+        self._wheel_brake[:] = value
+
+    @property
+    def thrust(self) -> np.ndarray:
+        """Get the current thrust force of the aircraft
+
+        Returns:
+            np.ndarray: current thrust forces [N]
+        """
+        return self._thrust * self.config.max_thrust
+
+    @property
+    def airspeed(self) -> np.ndarray:
+        """Get the aircraft airspeeds
+
+        Returns:
+            np.ndarray: current airspeeds [m/s]
+        """
+        return _norm(self.vel)
+
+    def set_controls(self, thrust_setting: np.ndarray, control_surface_angle: np.ndarray,
+                     wheel_brake: np.ndarray, indices: np.ndarray | None = None) -> None:
+        """Set the control settings of (a subset of) the aircraft
+
+        Args:
+            thrust_setting (np.ndarray): thrust settings, clipped to [0.0, 1.0]
+            control_surface_angle (np.ndarray): control surface angles, clipped to
+                [-max_angle, max_angle] [rad]
+            wheel_brake (np.ndarray): wheel brake settings
+            indices (np.ndarray | None, optional): aircraft to set. Defaults to all aircraft.
+        """
+        if indices is None:
+            indices = slice(None)
+        max_angle = self._parameters(indices)[0].max_control_surface_angle
+        self._thrust[indices] = np.clip(thrust_setting, 0.0, 1.0)
+        self._control_surface_angle[indices] = np.clip(control_surface_angle,
+                                                       -max_angle, max_angle)
+        self._wheel_brake[indices] = wheel_brake
+
+    def state(self, indices: np.ndarray | None = None,
+              out: np.ndarray | None = None) -> np.ndarray:
+        """Get the normalized controller input state of (a subset of) the aircraft
+
+        Args:
+            indices (np.ndarray | None, optional): aircraft to get. Defaults to all aircraft.
+            out (np.ndarray | None, optional): array of at least n rows (of the fleet precision) to
+                write the states to. Defaults to None (a new array).
+
+        Returns:
+            np.ndarray: (n, 6) array of [x, y, vx, vy, pitch, pitch rate] states
+        """
+        if out is None:
+            if indices is None:
+                indices = slice(None)
+            return np.column_stack((self.pos[indices], self.vel[indices], self.pitch[indices],
+                                    self.pitch_rate[indices])) / self._state_scale
+
+        # Gather straight into the output array
+        if indices is None:
+            indices = np.arange(self.size)
+        out = out[:len(indices)]
+        for columns, source in ((slice(0, 2), self.pos), (slice(2, 4), self.vel),
+                                (4, self.pitch), (5, self.pitch_rate)):
+            np.take(source, indices, axis=0, out=out[:, columns], mode='clip')  # (unbuffered)
+        out /= self._state_scale
+        return out
+
+    def landed(self) -> np.ndarray:
+        """Whether each aircraft has come to a stop on the landing runway
+
+        Returns:
+            np.ndarray: (size,) boolean array
+        """
+        return self._landed(self.pos, self.vel, self.on_ground, self.crashed,
+                            self._parameters(slice(None)))
+
+    def _parameters(self, aircraft: np.ndarray | slice) -> Parameters:
+        """Get the parameters of a set of aircraft
+
+        Args:
+            aircraft (np.ndarray | slice): aircraft indices
+
+        Returns:
+            Parameters: aircraft, environment and terrain parameters (shared, or one value per
+                aircraft for a scenario batch)
+        """
+        return self._subset((self.config, self.environment, self.terrain), aircraft)
+
+    def _subset(self, parameters: Parameters, rows: np.ndarray | slice) -> Parameters:
+        """Get the parameters of a subset of a set of aircraft
+
+        Args:
+            parameters (Parameters): parameters of the set of aircraft
+            rows (np.ndarray | slice): rows of the subset within the set (indices or boolean mask)
+
+        Returns:
+            Parameters: parameters of the subset
+        """
+        if self.scenarios is None:
+            return parameters
+        config, environment, terrain = parameters
+        return _select(config, rows), _select(environment, rows), terrain.subset(rows)
+
+    def _landed(self, pos: np.ndarray, vel: np.ndarray, on_ground: np.ndarray,
+                crashed: np.ndarray, parameters: Parameters) -> np.ndarray:
+        """Whether each of a set of aircraft has come to a stop on the landing runway
+
+        Args:
+            pos (np.ndarray): (n, 2) positions [m]
+            vel (np.ndarray): (n, 2) velocities [m/s]
+            on_ground (np.ndarray): (n,) whether each aircraft is on the ground
+            crashed (np.ndarray): (n,) whether each aircraft has crashed
+            parameters (Parameters): parameters of the aircraft
+
+        Returns:
+            np.ndarray: (n,) boolean array
+        """
+        terrain = parameters[2]
+        return on_ground & ~crashed & (vel[:, 0] < 1.0) & (pos[:, 0] > terrain.runways[1][0])
+
+    def calculate_forces(self) -> np.ndarray:
+        """Calculate the forces acting on every aircraft
+
+        Returns:
+            np.ndarray: (size, 2) array of total force vectors [N]
+        """
+        total_force, self.stalled[:] = self._forces(self.pos, self.vel, self.pitch, self.on_ground,
+                                                    self._thrust, self._wheel_brake,
+                                                    self._parameters(slice(None)))
+        return total_force
+
+    def _forces(self, pos: np.ndarray, vel: np.ndarray, pitch: np.ndarray, on_ground: np.ndarray,
+                thrust_setting: np.ndarray, wheel_brake: np.ndarray,
+                parameters: Parameters) -> tuple[np.ndarray, np.ndarray]:
+        """Calculate the forces acting on a set of aircraft
+
+        Args:
+            pos (np.ndarray): (n, 2) positions [m]
+            vel (np.ndarray): (n, 2) velocities [m/s]
+            pitch (np.ndarray): (n,) pitch angles [rad]
+            on_ground (np.ndarray): (n,) whether each aircraft is on the ground
+            thrust_setting (np.ndarray): (n,) thrust settings [-]
+            wheel_brake (np.ndarray): (n,) wheel brake settings [-]
+            parameters (Parameters): parameters of the aircraft
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (n, 2) total force vectors [N], (n,) stalled flags
+        """
+        config, environment, terrain = parameters
+
+        # Get velocity unit vectors
+        v = _norm(vel)
+        moving = v > 1e-5
+        vel_unit = np.empty_like(vel)
+        vel_unit[:] = (1.0, 0.0)  # default
+        vel_unit[moving] = vel[moving] / v[moving, None]
+
+        # Calculate angle of attack
+        flight_path_angle = np.arctan2(vel_unit[:, 1], vel_unit[:, 0])
+        alpha = pitch - flight_path_angle
+
+        # Calculate lift and drag coefficients
+        stalled = np.abs(alpha) > config.stall_angle
+        lift_coefficient = np.where(stalled, 0.0, config.lift_curve_slope * alpha)
+        drag_coefficient = config.parasite_drag_coefficient \
+            + config.induced_drag_factor * _square(lift_coefficient)
+
+        # Calculate lift and drag
+        dynamic_pressure = 0.5 * environment.air_density * _square(v)
+        lift_mag = dynamic_pressure * config.reference_area * lift_coefficient
+        drag_mag = dynamic_pressure * config.reference_area * drag_coefficient
+        lift = lift_mag[:, None] * np.column_stack((-vel_unit[:, 1], vel_unit[:, 0]))
+        drag = drag_mag[:, None] * -vel_unit
+
+        # Calculate gravity and thrust
+        gravity = np.zeros_like(vel)
+        gravity[:, 1] = -environment.gravity * config.mass
+        thrust = (thrust_setting * config.max_thrust)[:, None] * vel_unit
+
+        # Calculate wheel brake
+        wheel_drag = np.zeros_like(vel)
+        braking = on_ground & (vel[:, 0] > 1e-5) & (pos[:, 0] > terrain.runways[0][1])
+        wheel_drag[:, 0] = np.where(braking, - wheel_brake * config.max_wheel_brake_force, 0.0)
+
+        return lift + drag + gravity + thrust + wheel_drag, stalled
+
+    def step(self, dt: float) -> None:
+        """Perform a simulation step for all active aircraft
+
+        Aircraft that crash or come to a stop on the landing runway are removed from the active set,
+        so their final state stays frozen. The active aircraft are stepped chunk_size at a time.
+
+        Args:
+            dt (float): timestep [s]
+        """
+        self.step_count += 1
+        idx = self.active
+        if idx.size == 0:
+            return
+        keep = self._keep[:idx.size]
+        for start in range(0, idx.size, self.chunk_size):
+            chunk = idx[start:start + self.chunk_size]
+            parameters = self._parameters(chunk)
+            if self.integrator == 'euler':
+                self._step_euler(chunk, dt, parameters)
+            else:
+                self._step_continuous(chunk, dt, parameters)
+            self.steps[chunk] += 1
+
+            # Find crashed and landed aircraft
+            crashed = self.crashed[chunk]
+            landed = self._landed(self.pos[chunk], self.vel[chunk], self.on_ground[chunk], crashed,
+                                  parameters)
+            np.logical_not(crashed | landed, out=keep[start:start + chunk.size])
+
+        # Remove crashed and landed aircraft from the active set
+        self.active = idx[keep]
+
+    def _step_euler(self, idx: np.ndarray, dt: float, parameters: Parameters) -> None:
+        """Perform a semi-implicit Euler step for a set of aircraft (same as Aircraft2D.step)
+
+        Args:
+            idx (np.ndarray): indices of the aircraft
+            dt (float): timestep [s]
+            parameters (Parameters): parameters of the aircraft
+        """
+        config, _, terrain = parameters
+        pos = self.pos[idx]
+        vel = self.vel[idx]
+        on_ground = self.on_ground[idx]
+
+        # Calculate acceleration
+        total_force, self.stalled[idx] = self._forces(pos, vel, self.pitch[idx], on_ground,
+                                                      self._thrust[idx], self._wheel_brake[idx],
+                                                      parameters)
+        acceleration = total_force / _column(config.mass)
+
+        # Update velocity and position
+        vel += acceleration * dt
+        pos += vel * dt
+
+        # Update pitch angle based on control surface angle
+        airspeed = _norm(vel)
+        effectiveness = airspeed / (airspeed + config.control_effectiveness_speed)
+        pitch_rate = config.pitch_rate_gain * self._control_surface_angle[idx] * effectiveness
+        pitch = self.pitch[idx] + pitch_rate * dt
+        pitch = np.clip(pitch, -np.pi / 2, np.pi / 2)  # limit pitch angle
+        pitch = np.where(on_ground, np.clip(pitch, -0.2, 0.2), pitch)
+
+        # Check crash
+        crashed = ~on_ground & (pos[:, 1] <= 0.0) & \
+            (np.abs(vel[:, 1]) > config.max_vertical_landing_speed)
+        vel[crashed] = 0.0
+
+        # Check ground contact
+        below_ground = pos[:, 1] < 0.0
+        pos[below_ground, 1] = 0.0
+        vel[below_ground & (vel[:, 1] < 0.0), 1] = 0.0
+        now_on_ground = (pos[:, 1] <= 0.0) & (vel[:, 1] <= 1e-9)
+        crashed |= ~on_ground & now_on_ground & (np.abs(pitch) > 0.2)
+        on_ground = now_on_ground
+
+        # Check terrain collision
+        collided = (on_ground & ~terrain.is_runway(pos[:, 0])) | \
+            terrain.hit_mountain(pos[:, 0], pos[:, 1])
+
+        # Check exceeded runway
+        collided |= pos[:, 0] > terrain.runways[-1][1]
+        vel[collided] = 0.0
+        crashed |= collided
+
+        # Store state
+        self.pos[idx] = pos
+        self.vel[idx] = vel
+        self.pitch[idx] = pitch
+        self.pitch_rate[idx] = pitch_rate
+        self.on_ground[idx] = on_ground
+        self.crashed[idx] = crashed
+
+    def _step_continuous(self, idx: np.ndarray, dt: float, parameters: Parameters) -> None:
+        """Integrate the flight of a set of aircraft over a step with the RK4 or adaptive integrator
+
+        Controls are constant during the step. Aircraft that touch down, collide or overrun the
+        runway are advanced to the moment of the event. After a successful touchdown, they continue
+        on the ground for the rest of the step.
+
+        Args:
+            idx (np.ndarray): indices of the aircraft
+            dt (float): timestep [s]
+            parameters (Parameters): parameters of the aircraft
+        """
+        config = parameters[0]
+        state = np.column_stack((self.pos[idx], self.vel[idx], self.pitch[idx]))
+        on_ground = self.on_ground[idx]
+        crashed = np.zeros(idx.size, dtype=bool)
+        thrust = self._thrust[idx]
+        control_surface_angle = self._control_surface_angle[idx]
+        wheel_brake = self._wheel_brake[idx]
+        step_size = self.step_size[idx]
+        _, self.stalled[idx] = self._forces(state[:, :2], state[:, 2:4], state[:, 4], on_ground,
+                                            thrust, wheel_brake, parameters)
+
+        remaining = np.full(idx.size, dt, self.dtype)
+        rows = np.arange(idx.size)
+        rows_parameters = parameters
+        for _ in range(self.MAX_EVENTS):
+            start = state[rows]
+            ground = on_ground[rows]
+            controls = (thrust[rows], control_surface_angle[rows], wheel_brake[rows])
+            rows_step_size = step_size[rows]
+            end = self._advance(start, ground, controls, remaining[rows], rows_step_size,
+                                rows_parameters)
+
+            # Aircraft without events complete the step
+            event = self._event(end, ground, rows_parameters)
+            # (aircraft on the ground only lift off when climbing, as in the Euler step)
+            free = rows[~event]
+            end = end[~event]
+            stays_on_ground = ground[~event] & (end[:, 3] <= 1e-9)
+            end[stays_on_ground, 1] = 0.0
+            end[stays_on_ground, 3] = 0.0
+            state[free] = end
+            on_ground[free] = stays_on_ground
+            step_size[rows] = rows_step_size
+            if not event.any():
+                break
+
+            # Advance the other aircraft to their event
+            start, ground, rows = start[event], ground[event], rows[event]
+            controls = tuple(control[event] for control in controls)
+            event_parameters = self._subset(rows_parameters, event)
+            event_time = locate_event(
+                lambda duration: self._advance(start, ground, controls, duration, step_size[rows],
+                                               event_parameters),
+                lambda states: self._event(states, ground, event_parameters),
+                remaining[rows])
+            end = self._advance(start, ground, controls, event_time, step_size[rows],
+                                event_parameters)
+            remaining[rows] -= event_time
+
+            # Check collision and touchdown
+            event_config, _, event_terrain = event_parameters
+            collided = self._collided(end, ground, event_parameters)
+            touchdown = ~ground & (end[:, 1] <= 0.0) & ~collided
+            hard_landing = touchdown & (
+                (np.abs(end[:, 3]) > event_config.max_vertical_landing_speed) |
+                (np.abs(end[:, 4]) > 0.2) | ~event_terrain.is_runway(end[:, 0]))
+            end[:, 1] = np.maximum(end[:, 1], 0.0)
+            end[touchdown, 3] = 0.0
+            end[collided | hard_landing, 2:4] = 0.0
+            state[rows] = end
+            on_ground[rows] = end[:, 1] <= 0.0
+            crashed[rows] = collided | hard_landing
+
+            # Continue the rest of the step on the ground after a successful touchdown
+            continuing = ~crashed[rows] & (remaining[rows] > 0.0)
+            rows = rows[continuing]
+            if rows.size == 0:
+                break
+            rows_parameters = self._subset(event_parameters, continuing)
+
+        # Store state
+        airspeed = _norm(state[:, 2:4])
+        effectiveness = airspeed / (airspeed + config.control_effectiveness_speed)
+        self.pos[idx] = state[:, :2]
+        self.vel[idx] = state[:, 2:4]
+        self.pitch[idx] = state[:, 4]
+        self.pitch_rate[idx] = config.pitch_rate_gain * control_surface_angle * effectiveness
+        self.on_ground[idx] = on_ground
+        self.crashed[idx] = crashed
+        self.step_size[idx] = step_size
+
+    def _derivative(self, state: np.ndarray, on_ground: np.ndarray,
+                    controls: tuple[np.ndarray, np.ndarray, np.ndarray],
+                    parameters: Parameters) -> np.ndarray:
+        """Time derivative of a set of aircraft states
+
+        Args:
+            state (np.ndarray): (n, 5) [x, y, vx, vy, pitch] states
+            on_ground (np.ndarray): (n,) whether each aircraft is on the ground (the ground
+                prevents downward acceleration)
+            controls (tuple[np.ndarray, np.ndarray, np.ndarray]): thrust settings, control surface
+                angles and wheel brake settings
+            parameters (Parameters): parameters of the aircraft
+
+        Returns:
+            np.ndarray: (n, 5) state derivatives
+        """
+        config = parameters[0]
+        thrust, control_surface_angle, wheel_brake = controls
+        pitch_limit = np.where(on_ground, self.dtype.type(0.2), self.dtype.type(np.pi / 2))
+        pos, vel = state[:, :2], state[:, 2:4]
+        pitch = np.clip(state[:, 4], -pitch_limit, pitch_limit)
+
+        # Calculate acceleration (the ground pushes back against downward acceleration)
+        total_force, _ = self._forces(pos, vel, pitch, on_ground, thrust, wheel_brake, parameters)
+        acceleration = total_force / _column(config.mass)
+        acceleration[:, 1] = np.where(on_ground, np.maximum(acceleration[:, 1], 0.0),
+                                      acceleration[:, 1])
+
+        # Calculate pitch rate (zero when pushing against the pitch angle limit)
+        airspeed = _norm(vel)
+        effectiveness = airspeed / (airspeed + config.control_effectiveness_speed)
+        pitch_rate = config.pitch_rate_gain * control_surface_angle * effectiveness
+        limited = ((pitch >= pitch_limit) & (pitch_rate > 0.0)) | \
+            ((pitch <= -pitch_limit) & (pitch_rate < 0.0))
+        pitch_rate[limited] = 0.0
+        return np.column_stack((vel, acceleration, pitch_rate))
+
+    def _advance(self, state: np.ndarray, on_ground: np.ndarray,
+                 controls: tuple[np.ndarray, np.ndarray, np.ndarray], duration: np.ndarray,
+                 step_size: np.ndarray, parameters: Parameters) -> np.ndarray:
+        """Integrate a set of aircraft states over a duration (without event handling)
+
+        Args:
+            state (np.ndarray): (n, 5) [x, y, vx, vy, pitch] states
+            on_ground (np.ndarray): (n,) whether each aircraft is on the ground
+            controls (tuple[np.ndarray, np.ndarray, np.ndarray]): thrust settings, control surface
+                angles and wheel brake settings
+            duration (np.ndarray): (n,) durations [s]
+            step_size (np.ndarray): (n,) adaptive integrator step sizes [s], updated in place
+            parameters (Parameters): parameters of the aircraft
+
+        Returns:
+            np.ndarray: (n, 5) states after the duration, with pitch angle limits applied
+        """
+        def derivative(states: np.ndarray) -> np.ndarray:
+            return self._derivative(states, on_ground, controls, parameters)
+
+        if self.integrator == 'rk4':
+            state = rk4_step(derivative, state, duration)
+        else:
+            state = rk4_adaptive(derivative, state, duration, step_size, self.tolerance)
+        state[:, 1] = np.where(on_ground, np.maximum(state[:, 1], 0.0), state[:, 1])
+        state[:, 4] = np.clip(state[:, 4], -np.pi / 2, np.pi / 2)
+        state[:, 4] = np.where(on_ground, np.clip(state[:, 4], -0.2, 0.2), state[:, 4])
+        return state
+
+    def _collided(self, state: np.ndarray, on_ground: np.ndarray,
+                  parameters: Parameters) -> np.ndarray:
+        """Whether each aircraft hit a mountain, overran the last runway or rolled off a runway
+
+        Args:
+            state (np.ndarray): (n, 5) [x, y, vx, vy, pitch] states
+            on_ground (np.ndarray): (n,) whether each aircraft is on the ground
+            parameters (Parameters): parameters of the aircraft
+
+        Returns:
+            np.ndarray: (n,) boolean array
+        """
+        terrain = parameters[2]
+        x, y = state[:, 0], state[:, 1]
+        return (on_ground & ~terrain.is_runway(x)) | terrain.hit_mountain(x, y) | \
+            (x > terrain.runways[-1][1])
+
+    def _event(self, state: np.ndarray, on_ground: np.ndarray,
+               parameters: Parameters) -> np.ndarray:
+        """Whether each aircraft touched the ground or collided
+
+        Args:
+            state (np.ndarray): (n, 5) [x, y, vx, vy, pitch] states
+            on_ground (np.ndarray): (n,) whether each aircraft was on the ground at the step start
+            parameters (Parameters): parameters of the aircraft
+
+        Returns:
+            np.ndarray: (n,) boolean array
+        """
+        return (~on_ground & (state[:, 1] <= 0.0)) | self._collided(state, on_ground, parameters)
@@ -1,10 +1,14 @@
 import numpy as np
-import random
 
 from aircraft import Aircraft2D
-from controller import Controller
-from evaluate import evaluate_aircraft
+from cache import FitnessCache
+from controller import ControllerBank
+from evaluate import evaluate_aircraft, evaluate_fleet
+from fleet import AircraftFleet
+from rollout import CachedRollout, ParallelRollout, RolloutResult, rollout
+from scenario import Scenario, ScenarioBatch
 from terrain import Terrain
+from viewer import FleetSnapshot
 
 
 class GeneticAlgorithm:
@@ -13,30 +17,81 @@ class GeneticAlgorithm:
     def __init__(self,
                  population_size: int = 50,
                  elite_fraction: float = 0.2,
-                 mutation_rate: float = 0.1) -> None:
+                 mutation_rate: float = 0.1,
+                 workers: int = 1,
+                 cache_size: int = 0) -> None:
         """Create a new algorithm instance
 
         Args:
             population_size (int, optional): size of population per generation. Defaults to 50.
             elite_fraction (float, optional): percentage of best population. Defaults to 0.2.
             mutation_rate (float, optional): mutation rate. Defaults to 0.1.
+            workers (int, optional): number of processes for episode rollouts. Defaults to 1.
+            cache_size (int, optional): number of scores to keep in a fitness cache, so unchanged
+                controllers are not simulated again. Defaults to 0 (no cache).
         """
         self.population_size: int = population_size
         self.elite_fraction: int = elite_fraction
         self.mutation_rate: float = mutation_rate
         self.generation: int = 0
+        self.workers: int = workers
+        self.cache: FitnessCache | None = FitnessCache(cache_size) if cache_size > 0 else None
+        self._parallel_rollout: ParallelRollout | None = None
+
+    def rollout(self, population: ControllerBank, scenario: Scenario | ScenarioBatch,
+                episode_time: float, dt: float, record_stride: int = 1,
+                record_top: int | None = None, snapshot: FleetSnapshot | None = None,
+                integrator: str = 'euler') -> RolloutResult:
+        """Simulate an episode and score every controller in the population
+
+        With more than one worker, the population is split over a process pool. With a fitness
+        cache, controllers that were already flown under the same conditions are not simulated
+        again. The results are identical to a serial rollout without cache.
+
+        Args:
+            population (ControllerBank): population of controllers
+            scenario (Scenario | ScenarioBatch): scenario(s) to fly in
+            episode_time (float): simulated episode duration [s]
+            dt (float): fixed timestep [s]
+            record_stride (int, optional): record one sample every stride steps. Defaults to 1.
+            record_top (int | None, optional): only record the full trajectories of this many best
+                controllers. Defaults to None (record the positions of all aircraft).
+            snapshot (FleetSnapshot | None, optional): live viewer buffer. Defaults to None.
+            integrator (str, optional): fleet integrator ('euler', 'rk4' or 'adaptive').
+                Defaults to 'euler'.
+
+        Returns:
+            RolloutResult: scores for each controller and the best trajectories
+        """
+        backend = rollout
+        if self.workers > 1:
+            if self._parallel_rollout is None:
+                self._parallel_rollout = ParallelRollout(self.workers)
+            backend = self._parallel_rollout
+        if self.cache is not None:
+            backend = CachedRollout(backend, self.cache)
+        return backend(population, scenario, episode_time, dt, record_stride, record_top, snapshot,
+                       integrator)
+
+    def close(self) -> None:
+        """Shut down the rollout worker processes (if any)"""
+        if self._parallel_rollout is not None:
+            self._parallel_rollout.close()
+            self._parallel_rollout = None
 
     def evaluate(self,
-                 aircraft: list[Aircraft2D], terrain: Terrain) -> np.ndarray[np.float64]:
+                 aircraft: list[Aircraft2D] | AircraftFleet, terrain: Terrain) -> np.ndarray[np.float64]:
         """Evaluate the fitness of each aircraft in the population
 
         Args:
-            aircraft (list[Aircraft2D]): population of aircraft
+            aircraft (list[Aircraft2D] | AircraftFleet): population of aircraft
             terrain (Terrain): terrain for collision checks
 
         Returns:
             np.ndarray[np.float64]: scores for each aircraft
         """
+        if isinstance(aircraft, AircraftFleet):
+            return evaluate_fleet(aircraft, terrain)
         fitness_scores = []
         for ac in aircraft:
             score = evaluate_aircraft(ac, terrain)
@@ -44,59 +99,71 @@ class GeneticAlgorithm:
         return np.array(fitness_scores)
     
     def next_generation(self,
-                        controllers: list[Controller],
-                        fitness_scores: np.ndarray[np.float64]) -> list[Controller]:
+                        population: ControllerBank,
+                        fitness_scores: np.ndarray[np.float64]) -> ControllerBank:
         """Create the next generation of controllers
 
+        The new population consists of the elites, mutants of the best controller (at twice the
+        mutation rate) and mutated children of random pairs of elites, in that order.
+
         Args:
-            controllers (list[Controller]): current population of controllers
+            population (ControllerBank): current population of controllers
             fitness_scores (np.ndarray[np.float64]): scores for each controller
 
         Returns:
-            list[Controller]: new population of controllers
+            ControllerBank: new population of controllers
         """
         elite_count = int(self.elite_fraction * self.population_size)
+        size = max(self.population_size, 2 * elite_count)
+        child_count = size - 2 * elite_count
         sorted_idcs = np.argsort(fitness_scores)[::-1]
-        new_controllers = []
+        params = np.empty((size, population.n_params), population.params.dtype)
+        new_population = ControllerBank(params, *population.sizes)
 
         # Select elites
-        for i in range(elite_count):
-            new_controllers.append(controllers[sorted_idcs[i]])
-
-        # Add mutations of best controller (for landing)
-        best_controller = controllers[sorted_idcs[0]]
-        for _ in range(elite_count):
-            mutant = Controller()
-            mutant.w1 = np.copy(best_controller.w1)
-            mutant.b1 = np.copy(best_controller.b1)
-            mutant.w2 = np.copy(best_controller.w2)
-            mutant.b2 = np.copy(best_controller.b2)
-            mutant.mutate(self.mutation_rate * 2)
-            new_controllers.append(mutant)
-
-        # Crossover and mutate elites
-        while len(new_controllers) < self.population_size:
-            parent1, parent2 = random.sample(new_controllers[:elite_count], 2)
-            child = self.crossover(parent1, parent2)
-            child.mutate(self.mutation_rate)
-            new_controllers.append(child)
+        elites = params[:elite_count]
+        elites[:] = population.params[sorted_idcs[:elite_count]]
+
+        # Add mutants of best controller (for landing)
+        params[elite_count:2 * elite_count] = population.params[sorted_idcs[0]]
+
+        # Crossover random pairs of elites
+        parent1, parent2 = self.select_parents(elite_count, child_count)
+        params[2 * elite_count:] = self.crossover(elites[parent1], elites[parent2])
+
+        # Mutate mutants and children (mutants at twice the mutation rate)
+        rates = np.repeat([2 * self.mutation_rate, self.mutation_rate], [elite_count, child_count])
+        noise = np.random.randn(size - elite_count, population.n_params)
+        params[elite_count:] += rates[:, None] * noise
 
         self.generation += 1
-        return new_controllers
-    
-    def crossover(self, parent1: Controller, parent2: Controller) -> Controller:
-        """Crossover two controllers to create a child controller
+        return new_population
+
+    def select_parents(self, elite_count: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """Pick random pairs of distinct elites
+
+        Args:
+            elite_count (int): number of elites to pick from
+            count (int): number of pairs
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: elite indices of the first and second parents
+        """
+        if count > 0 and elite_count < 2:
+            raise ValueError(f'Crossover needs at least 2 elites, got {elite_count}')
+        parent1 = np.random.randint(0, elite_count, count)
+        parent2 = np.random.randint(0, max(elite_count - 1, 1), count)
+        parent2 += parent2 >= parent1  # skip the first parent
+        return parent1, parent2
+
+    def crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> np.ndarray:
+        """Crossover controllers to create child controllers
 
         Args:
-            parent1 (Controller): first parent
-            parent2 (Controller): second parent
+            parent1 (np.ndarray): (n_params,) or (n, n_params) parameters of the first parents
+            parent2 (np.ndarray): (n_params,) or (n, n_params) parameters of the second parents
 
         Returns:
-            Controller: child controller
+            np.ndarray: parameters of the children
         """
-        child = Controller()
-        child.w1 = (parent1.w1 + parent2.w1) / 2
-        child.b1 = (parent1.b1 + parent2.b1) / 2
-        child.w2 = (parent1.w2 + parent2.w2) / 2
-        child.b2 = (parent1.b2 + parent2.b2) / 2
-        return child
+        return (parent1 + parent2) / 2
@@ -0,0 +1,280 @@
+"""Island-model training: populations that evolve in separate processes and exchange migrants"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from controller import ControllerBank
+from genetic import GeneticAlgorithm
+from integrators import INTEGRATORS
+from rollout import RolloutResult, top_indices
+from runstore import RunWriter
+from scenario import Scenario, default_scenario
+from simulation import DEFAULT_DT
+
+
+TOPOLOGIES = ('ring', 'full')
+
+
+@dataclass
+class Island:
+    population_size: int = 200    # [-] population size
+    elite_fraction: float = 0.05  # [-] fraction of the population kept as elites
+    mutation_rate: float = 0.09   # [-] mutation noise scale
+
+
+@dataclass
+class IslandState:
+    island: Island                 # island parameters
+    population: ControllerBank     # current population
+    scores: np.ndarray | None      # scores of the current population (None before evaluation)
+    generation: int                # generation number of the current population
+    episode_time: float            # [s] episode duration of the current population
+    random_state: tuple            # state of the island's random generator
+
+
+def destinations(index: int, count: int, topology: str) -> list[int]:
+    """Get the islands that an island sends its migrants to
+
+    Args:
+        index (int): island index
+        count (int): number of islands
+        topology (str): migration topology ('ring' or 'full')
+
+    Returns:
+        list[int]: destination island indices
+    """
+    if count < 2:
+        return []
+    if topology == 'ring':
+        return [(index + 1) % count]
+    if topology == 'full':
+        return [i for i in range(count) if i != index]
+    raise ValueError(f'Unknown topology: {topology}')
+
+
+def evolve(state: IslandState, scenario: Scenario, generations: int, episode_time_step: float,
+           max_episode_time: float, dt: float,
+           integrator: str) -> tuple[IslandState, list[tuple[float, RolloutResult, np.ndarray]]]:
+    """Evolve an island for a number of generations (ends with an evaluated population)
+
+    Stops early if an aircraft lands.
+
+    Args:
+        state (IslandState): island state
+        scenario (Scenario): scenario to train in
+        generations (int): number of generations to evaluate
+        episode_time_step (float): episode duration increase per generation [s]
+        max_episode_time (float): maximum episode duration [s]
+        dt (float): fixed simulation timestep [s]
+        integrator (str): fleet integrator
+
+    Returns:
+        tuple[IslandState, list[tuple[float, RolloutResult, np.ndarray]]]: new island state, and
+            the episode time, rollout result and best controller parameters of every generation
+    """
+    np.random.set_state(state.random_state)
+    island = state.island
+    ga = GeneticAlgorithm(island.population_size, island.elite_fraction, island.mutation_rate)
+    ga.generation = state.generation
+    population = state.population
+    scores = state.scores
+    episode_time = state.episode_time
+    history = []
+    for _ in range(generations):
+        # Create next generation (from the scores of the previous epoch, including immigrants)
+        if scores is not None:
+            population = ga.next_generation(population, scores)
+            episode_time = min(episode_time + episode_time_step, max_episode_time)
+
+        # Simulate episode and calculate scores for each aircraft
+        result = ga.rollout(population, scenario, episode_time, dt, integrator=integrator)
+        scores = result.scores
+        history.append((episode_time, result, population.params[result.best].copy()))
+        if result.landed.any():
+            break
+    return IslandState(island, population, scores, ga.generation, episode_time,
+                       np.random.get_state()), history
+
+
+def migrate(states: list[IslandState], migrants: int, topology: str) -> None:
+    """Copy the best controllers of every island over the worst controllers of its destinations
+
+    Migrants keep their scores, so they are selected like any other controller of their new island.
+
+    Args:
+        states (list[IslandState]): evaluated island states (updated in place)
+        migrants (int): number of controllers each island sends to each destination
+        topology (str): migration topology ('ring' or 'full')
+    """
+    # Select emigrants before any island receives immigrants
+    emigrants = []
+    for state in states:
+        best = top_indices(state.scores, migrants)
+        emigrants.append((state.population.params[best].copy(), state.scores[best].copy()))
+
+    # Replace the worst controllers (never the elites) with immigrants
+    arrivals = [[] for _ in states]
+    for i in range(len(states)):
+        for j in destinations(i, len(states), topology):
+            arrivals[j].append(emigrants[i])
+    for state, incoming in zip(states, arrivals):
+        if not incoming:
+            continue
+        params = np.concatenate([params for params, _ in incoming])
+        scores = np.concatenate([scores for _, scores in incoming])
+        elite_count = int(state.island.elite_fraction * state.island.population_size)
+        count = min(len(scores), len(state.scores) - elite_count)
+        worst = np.argsort(state.scores, kind='stable')[:count]
+        state.population.params[worst] = params[:count]
+        state.scores[worst] = scores[:count]
+
+
+def train_islands(islands: list[Island],
+                  scenario: Scenario,
+                  out_folder: str,
+                  migration_interval: int = 5,
+                  migrants: int = 2,
+                  topology: str = 'ring',
+                  episode_time: float = 30.0,
+                  episode_time_step: float = 1.0,
+                  max_episode_time: float = 85.0,
+                  max_generations: int = 100,
+                  dt: float = DEFAULT_DT,
+                  integrator: str = 'euler',
+                  seed: int = 1,
+                  workers: int | None = None) -> list[float]:
+    """Train islands in parallel until an aircraft lands or the generation limit is reached
+
+    Each island evolves independently in a worker process for migration_interval generations, after
+    which the best controllers migrate between islands. The islands only synchronize to migrate.
+
+    Args:
+        islands (list[Island]): island parameters
+        scenario (Scenario): scenario to train in
+        out_folder (str): folder to store the best controllers and run history in
+        migration_interval (int, optional): generations between migrations. Defaults to 5.
+        migrants (int, optional): controllers sent to each destination per migration. Defaults to 2.
+        topology (str, optional): migration topology ('ring' or 'full'). Defaults to 'ring'.
+        episode_time (float, optional): initial episode duration [s]. Defaults to 30.0.
+        episode_time_step (float, optional): episode duration increase per generation [s].
+            Defaults to 1.0.
+        max_episode_time (float, optional): maximum episode duration [s]. Defaults to 85.0.
+        max_generations (int, optional): last generation to run. Defaults to 100.
+        dt (float, optional): fixed simulation timestep [s]. Defaults to DEFAULT_DT.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+        seed (int, optional): random seed (island i uses seed + i). Defaults to 1.
+        workers (int | None, optional): number of processes. Defaults to one per island.
+
+    Returns:
+        list[float]: best score (over all islands) per generation
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f'Unknown topology: {topology}')
+
+    # Create the initial populations
+    states = []
+    for i, island in enumerate(islands):
+        np.random.seed(seed + i)
+        population = ControllerBank.random(island.population_size)
+        states.append(IslandState(island, population, None, 0, episode_time, np.random.get_state()))
+
+    best_scores = []
+    history = RunWriter(out_folder)
+    with ProcessPoolExecutor(workers or len(islands)) as executor:
+        generation = 0
+        while True:
+            # Evolve all islands until the next migration
+            generations = min(migration_interval, max_generations + 1 - generation)
+            futures = [executor.submit(evolve, state, scenario, generations, episode_time_step,
+                                       max_episode_time, dt, integrator) for state in states]
+            results = [future.result() for future in futures]
+            states = [state for state, _ in results]
+
+            # Store the generations (until the first landing), combining all islands
+            landed = False
+            for step in range(max(len(epoch) for _, epoch in results)):
+                epoch = [epoch[step] for _, epoch in results if step < len(epoch)]
+                scores = np.concatenate([result.scores for _, result, _ in epoch])
+                landings = np.concatenate([result.landed for _, result, _ in epoch])
+                best_time, best_result, best_params = max(
+                    epoch, key=lambda item: item[1].scores[item[1].best])
+                best_bank = ControllerBank(best_params[None], *states[0].population.sizes)
+                best_bank.save(os.path.join(out_folder, f'best_gen{generation}.npz'), 0)
+                print(f'Generation {generation} best score: {scores.max():.2f}')
+                best_scores.append(scores.max())
+                history.append(generation, best_time, scores, landings,
+                               best_result.best_trajectory)
+                generation += 1
+                if landings.any():
+                    landed = True
+                    break
+            if landed or generation > max_generations:
+                break
+
+            # Exchange the best controllers
+            migrate(states, migrants, topology)
+    history.close()
+    return best_scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train aircraft controllers on parallel islands')
+    parser.add_argument('--islands', type=int, default=4, help='number of islands')
+    parser.add_argument('--population', type=int, default=200, help='population size per island')
+    parser.add_argument('--elite-fraction', type=float, nargs='+', default=[0.05],
+                        help='elite fraction (one value for all islands, or one per island)')
+    parser.add_argument('--mutation-rate', type=float, nargs='+', default=[0.09],
+                        help='mutation rate (one value for all islands, or one per island)')
+    parser.add_argument('--migration-interval', type=int, default=5,
+                        help='generations between migrations')
+    parser.add_argument('--migrants', type=int, default=2,
+                        help='controllers sent to each destination island per migration')
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='ring',
+                        help='migration topology')
+    parser.add_argument('--generations', type=int, default=100, help='maximum generation')
+    parser.add_argument('--episode-time', type=float, default=30.0, help='initial episode time [s]')
+    parser.add_argument('--episode-time-step', type=float, default=1.0,
+                        help='episode time increase per generation [s]')
+    parser.add_argument('--max-episode-time', type=float, default=85.0,
+                        help='maximum episode time [s]')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help='simulation timestep [s]')
+    parser.add_argument('--integrator', choices=INTEGRATORS, default='euler',
+                        help='integration scheme')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of processes (default: one per island)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--out', default=os.path.join('out', time.strftime('%Y%m%d-%H%M%S')),
+                        help='output folder')
+    args = parser.parse_args()
+
+    for name in ('elite_fraction', 'mutation_rate'):
+        values = getattr(args, name)
+        if len(values) not in (1, args.islands):
+            parser.error(f'--{name.replace("_", "-")} needs 1 or {args.islands} values')
+    islands = [Island(args.population,
+                      args.elite_fraction[i % len(args.elite_fraction)],
+                      args.mutation_rate[i % len(args.mutation_rate)])
+               for i in range(args.islands)]
+
+    os.makedirs(args.out, exist_ok=True)
+    train_islands(islands, default_scenario(), args.out,
+                  migration_interval=args.migration_interval,
+                  migrants=args.migrants,
+                  topology=args.topology,
+                  episode_time=args.episode_time,
+                  episode_time_step=args.episode_time_step,
+                  max_episode_time=args.max_episode_time,
+                  max_generations=args.generations,
+                  dt=args.dt,
+                  integrator=args.integrator,
+                  seed=args.seed,
+                  workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
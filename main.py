@@ -5,15 +5,20 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 import pygame as pg
 import numpy as np
 
-from aircraft import Aircraft2D, AircraftConfig
-from environment import Environment
-from terrain import Terrain
 from genetic import GeneticAlgorithm
-from controller import Controller
+from controller import ControllerBank
+from fleet import AircraftFleet
+from profiler import PhaseTimer
+from recorder import TrajectoryRecorder
+from render import AircraftRenderer, TerrainRenderer
+from runstore import RunWriter
+from scenario import default_scenario
 
 
 OUT_FOLDER = os.path.join('out', time.strftime('%Y%m%d-%H%M%S'))
 os.makedirs(OUT_FOLDER, exist_ok=True)
+PROFILE = True  # time each phase of the loop (written to profile.csv, press P for an overlay)
+PRECISION = np.float64  # floating point type of the genomes and simulation (or np.float32)
 
 np.random.seed(1)
 
@@ -26,88 +31,73 @@ def main():
     font = pg.font.Font(None, 24)
     pg.display.set_caption('Aircraft simulation')
 
-    # Set terrain and environment parameters
-    oceans = [(2000, 5000)]
-    runways = [(-400, 1400), (5600, 7400)]
-    mountains = []
-    terrain = Terrain(oceans, runways, mountains)
-    environment = Environment(
-        air_density = 1.225,
-        gravity = 9.81
-    )
-
-    # Set aircraft parameters
-    config = AircraftConfig(
-        mass = 1000.0,
-        max_thrust = 5000.0,
-        reference_area = 10.0,
-        lift_curve_slope = 5.0,
-        parasite_drag_coefficient = 0.02,
-        induced_drag_factor = 0.05,
-        pitch_rate_gain = 2.0,
-        max_control_surface_angle = np.radians(15.0),
-        wheel_drag_coefficient = 0.1,
-        stall_angle = np.radians(15.0),
-        max_vertical_landing_speed = 10.0,
-        control_effectiveness_speed = 50.0,
-        max_wheel_brake_force = 15000
-    )
+    # Set terrain, environment and aircraft parameters
+    scenario = default_scenario()
+    terrain = scenario.terrain
+    environment = scenario.environment
+    config = scenario.config
+    terrain_renderer = TerrainRenderer(terrain)
+    aircraft_renderer = AircraftRenderer()
 
     # Create GA
     ga = GeneticAlgorithm(population_size=200, elite_fraction=0.05, mutation_rate=0.09)
-    controllers = [Controller() for _ in range(ga.population_size)]
+    bank = ControllerBank.random(ga.population_size, dtype=PRECISION)
     episode_time = 30.0  # [s]
 
-    def reset_aircraft() -> list[Aircraft2D]:
-        return [Aircraft2D(config, environment, terrain) for _ in range(ga.population_size)]
+    def reset_fleet() -> tuple[AircraftFleet, TrajectoryRecorder]:
+        fleet = AircraftFleet(config, environment, terrain, ga.population_size, dtype=PRECISION)
+        return fleet, TrajectoryRecorder(np.arange(ga.population_size), channels=('pos',))
     
-    aircraft = reset_aircraft()
-    best_scores = []
-    best_paths = []
+    fleet, recorder = reset_fleet()
+    active_bank = bank
+    history = RunWriter(OUT_FOLDER)
     time = 0.0
     sim_speed = 5
+    timer = PhaseTimer(PROFILE)
+    show_profile = False
 
     # Main loop
     running = True
     while running:
 
         screen.fill((135, 206, 235))
-        dt = clock.tick(60) / 1000
+        with timer.phase('frame wait'):
+            dt = clock.tick(60) / 1000
+        frame_start = time
         time += dt * sim_speed
         fps = clock.get_fps()
 
         # Control aircraft using GA controllers
-        for ac, ctrl in zip(aircraft, controllers):
-            for _ in range(sim_speed):
-                state = np.array([
-                    ac.pos[0] / 7400,
-                    ac.pos[1] / 200,
-                    ac.vel[0] / 150,
-                    ac.vel[1] / 20,
-                    ac.pitch,
-                    ac.pitch_rate
-                ])
-                thrust_cmd, control_surface_cmd, brake_cmd = ctrl.forward(state)
-                ac.thrust_setting = thrust_cmd
-                ac.control_surface_angle = control_surface_cmd
-                ac.wheel_brake = brake_cmd
-                ac.step(dt)
+        for substep in range(sim_speed):
+            with timer.phase('state'):
+                if len(active_bank) != fleet.active.size:
+                    active_bank = bank.subset(fleet.active)
+                state = fleet.state(fleet.active)
+            with timer.phase('inference'):
+                commands = active_bank.forward(state)
+            with timer.phase('physics'):
+                fleet.set_controls(*commands, fleet.active)
+                fleet.step(dt)
+            with timer.phase('recording'):
+                recorder.record(fleet, frame_start + (substep + 1) * dt)  # time after the step
             
         # Update camera position (follow best aircraft)
-        max_x = max(ac.pos[0] for ac in aircraft if not ac.crashed)
+        alive = ~fleet.crashed
+        max_x = fleet.pos[alive if alive.any() else slice(None), 0].max()
         camera_pos = np.array([min(max_x, terrain.runways[1][1]), camera_pos[1]])
 
         # Draw terrain
-        terrain.draw(screen, camera_pos)
+        with timer.phase('terrain rendering'):
+            terrain_renderer.draw(screen, camera_pos)
 
         # Draw aircraft
-        for ac in aircraft:
-            ac.draw(screen, camera_pos, font)
+        with timer.phase('aircraft rendering'):
+            aircraft_renderer.draw_fleet(screen, camera_pos, fleet, font)
 
         # Draw FPS and max X position
         text = font.render(f'FPS: {fps:.0f}', True, (0, 0, 0))
         screen.blit(text, (10, 10))
-        text = font.render(f'No. of aircraft: {len(aircraft)}', True, (0, 0, 0))
+        text = font.render(f'No. of aircraft: {len(fleet)}', True, (0, 0, 0))
         screen.blit(text, (10, 30))
         text = font.render(f'Generation: {ga.generation}', True, (0, 0, 0))
         screen.blit(text, (10, 50))
@@ -118,6 +108,11 @@ def main():
         text = font.render(f'Sim. speed: {sim_speed}x', True, (0, 0, 0))
         screen.blit(text, (10, 110))
 
+        # Draw phase timings of the current generation
+        if show_profile:
+            for i, line in enumerate(timer.summary()):
+                screen.blit(font.render(line, True, (0, 0, 0)), (250, 10 + 20 * i))
+
         # Update simulation speed with keys
         pressed_keys = pg.key.get_pressed()
         if pressed_keys[pg.K_UP]:
@@ -126,43 +121,50 @@ def main():
             sim_speed = max(1, sim_speed - 1)
 
         # Handle events
-        pg.display.flip()
-        for event in pg.event.get():
-            if event.type == pg.QUIT:
-                running = False
-            if event.type == pg.VIDEORESIZE:
-                screen = pg.display.set_mode((event.w, event.h), pg.RESIZABLE)
-
-        if time >= episode_time or all(ac.crashed for ac in aircraft):
+        with timer.phase('display'):
+            pg.display.flip()
+        with timer.phase('events'):
+            for event in pg.event.get():
+                if event.type == pg.QUIT:
+                    running = False
+                if event.type == pg.VIDEORESIZE:
+                    screen = pg.display.set_mode((event.w, event.h), pg.RESIZABLE)
+                if event.type == pg.KEYDOWN and event.key == pg.K_p:
+                    show_profile = not show_profile
+
+        if time >= episode_time or fleet.active.size == 0:
             # Check if aircraft landed correctly
-            if any([ac.on_ground and not ac.crashed and ac.vel[0] < 1.0 \
-                and ac.pos[0] > terrain.runways[1][0] for ac in aircraft]) or ga.generation >= 100:
+            if fleet.landed().any() or ga.generation >= 100:
                 running = False
 
             # Calculate scores for each aircraft
-            scores = ga.evaluate(aircraft, terrain)
+            with timer.phase('evaluation'):
+                scores = ga.evaluate(fleet, terrain)
             
-            # Save best controller
-            filename = f'best_gen{ga.generation}.npz'
-            best_controller = controllers[np.argmax(scores)]
-            best_controller.save(os.path.join(OUT_FOLDER, filename))
+            # Save best controller, statistics and best path
+            with timer.phase('checkpoint'):
+                filename = f'best_gen{ga.generation}.npz'
+                bank.save(os.path.join(OUT_FOLDER, filename), np.argmax(scores))
+                history.append(ga.generation, episode_time, scores, fleet.landed(),
+                               recorder.trajectory(np.argmax(scores)))
             print(f'Generation {ga.generation} best score: {max(scores):.2f}')
-            best_scores.append(max(scores))
-
-            # Store best path
-            best_paths.append(np.array(aircraft[np.argmax(scores)].pos_history))
 
             # Create next generation
-            controllers = ga.next_generation(controllers, scores)
-            aircraft = reset_aircraft()
+            generation = ga.generation
+            with timer.phase('reproduction'):
+                bank = ga.next_generation(bank, scores)
+            active_bank = bank
+
+            # Save phase timings
+            timer.end_generation(generation)
+            timer.save(os.path.join(OUT_FOLDER, 'profile.csv'))
+            fleet, recorder = reset_fleet()
+            aircraft_renderer.reset_labels()
             time = 0.0
             episode_time += 1.0
             episode_time = min(episode_time, 85.0)
 
-    # Save best scores and paths
-    np.savez(os.path.join(OUT_FOLDER, 'generation_scores.npz'), np.array(best_scores))
-    np.savez(os.path.join(OUT_FOLDER, 'generation_paths.npz'), np.array(best_paths))
-
+    history.close()
     pg.quit()
 
 
@@ -1,16 +1,24 @@
+import os
+
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 
+from runstore import RunReader
+
 
 matplotlib.rc('font', size=18)
 
 
-FILE = 'out\\20250826-212840\\replay.npz'
+FILE = 'out\\20250826-212840\\replay.npz'  # replay file, or a run folder
+GENERATION = -1  # generation index to plot the best trajectory of (if FILE is a run folder)
 
 
 def main():
-    data = np.load(FILE)
+    if os.path.isdir(FILE):
+        data = RunReader(FILE).trajectory(GENERATION)
+    else:
+        data = np.load(FILE)
     pos_history = data['pos']
     vel_history = data['vel']
     pitch_history = data['pitch']
@@ -1,25 +1,48 @@
-import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 
+from runstore import RunReader
+
 
 matplotlib.rc('font', size=18)
 
 
-FILE = 'out\\20250824-184358\\generation_scores.npz'
+FOLDER = 'out\\20250824-184358'
+FOLLOW = False  # keep reading new generations while the run is going
+REFRESH = 2.0   # [s] time between reads when following
 
 
 def main():
-    scores = np.load(FILE)['arr_0']
-    print(len(scores))
+    reader = RunReader(FOLDER)
+    generations = reader.generations()
+    print(len(generations))
 
     fig, ax = plt.subplots(figsize=(8,4))
-    ax.plot(np.arange(1, len(scores) + 1), scores)
+    best_line, = ax.plot(generations['generation'], generations['best'], label='Best')
+    mean_line, = ax.plot(generations['generation'], generations['mean'], label='Mean')
     ax.set_xlabel('Generation')
-    ax.set_ylabel('Best score')
+    ax.set_ylabel('Score')
+    ax.legend()
     ax.grid()
     fig.tight_layout()
-    plt.show()
+    if not FOLLOW:
+        plt.show()
+        return
+
+    # Only read the generations that were added since the last read
+    count = len(generations)
+    while plt.fignum_exists(fig.number):
+        plt.pause(REFRESH)
+        new = reader.generations(count)
+        if len(new) == 0:
+            continue
+        count += len(new)
+        best_line.set_data(list(best_line.get_xdata()) + list(new['generation']),
+                           list(best_line.get_ydata()) + list(new['best']))
+        mean_line.set_data(list(mean_line.get_xdata()) + list(new['generation']),
+                           list(mean_line.get_ydata()) + list(new['mean']))
+        ax.relim()
+        ax.autoscale_view()
 
 if __name__ == '__main__':
     main()
@@ -2,27 +2,47 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
 
-matplotlib.rc('font', size=18)
+from sweep import PARAMETERS, generations_to_landing, load_results
 
-# Manually found by adjusting main.py:
-elite_fraction = [2.5, 5, 7.5, 10]  # mutation rate = 0.09
-elite_generation = [42, 41, 44, 46]
+matplotlib.rc('font', size=18)
 
-mutation_rate = [0.03, 0.06, 0.09, 0.12]  # elite fractinon = 0.05
-mutation_generation = [47, 42, 41, 45]
+# Results table of sweep.py
+FILE = 'out\\sweep\\results.csv'
 
-# Create plots
-fig, ax = plt.subplots(2, 1)
+LABELS = {
+    'population_size': 'Population size [-]',
+    'elite_fraction': 'Elite group size [-]',
+    'mutation_rate': 'Mutation rate [-]',
+    'episode_time': 'Initial episode time [s]',
+    'episode_time_step': 'Episode time step [s]',
+    'max_episode_time': 'Max. episode time [s]'
+}
 
-ax[0].plot(elite_fraction, elite_generation)
-ax[0].set_xlabel('Elite group size [%]')
-ax[0].set_ylabel('# of generations')
-ax[0].grid()
+# Generations to landing per trial (trials without landing are left out)
+results = load_results(FILE)
+trials = {}
+for trial in np.unique(results['trial']):
+    rows = results[results['trial'] == trial]
+    landing = generations_to_landing(rows)
+    if landing is not None:
+        trials[trial] = (rows[0], landing)
+print(f'{len(trials)} of {len(np.unique(results["trial"]))} trials landed')
 
-ax[1].plot(mutation_rate, mutation_generation)
-ax[1].set_xlabel('Mutation rate [-]')
-ax[1].set_ylabel('# of generations')
-ax[1].grid()
+# Create a plot per swept parameter (mean over seeds and other parameters, with min-max range)
+swept = [name for name in PARAMETERS if len(np.unique(results[name])) > 1]
+fig, ax = plt.subplots(len(swept), 1, squeeze=False)
+for axis, name in zip(ax[:, 0], swept):
+    values = np.unique(results[name])
+    landings = [[landing for row, landing in trials.values() if row[name] == value]
+                for value in values]
+    found = [i for i, landing in enumerate(landings) if landing]
+    mean = [np.mean(landings[i]) for i in found]
+    low = [mean[j] - min(landings[i]) for j, i in enumerate(found)]
+    high = [max(landings[i]) - mean[j] for j, i in enumerate(found)]
+    axis.errorbar(values[found], mean, yerr=[low, high], capsize=4)
+    axis.set_xlabel(LABELS[name])
+    axis.set_ylabel('# of generations')
+    axis.grid()
 
 fig.tight_layout()
-plt.show()
\ No newline at end of file
+plt.show()
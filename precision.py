@@ -0,0 +1,216 @@
+"""Validation report of float32 simulation: trajectory and fitness drift from float64"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from controller import ControllerBank
+from fleet import AircraftFleet
+from integrators import INTEGRATORS
+from recorder import TrajectoryRecorder
+from replay import checkpoints
+from rollout import score_episode, top_indices
+from scenario import Scenario, default_scenario
+from simulation import DEFAULT_DT, episode_steps, run_episode
+
+
+def fly(bank: ControllerBank, scenario: Scenario, episode_time: float, dt: float,
+        integrator: str, record_stride: int) -> tuple[AircraftFleet, TrajectoryRecorder, float]:
+    """Fly an episode in the precision of the bank, recording the positions of all aircraft
+
+    Args:
+        bank (ControllerBank): controllers
+        scenario (Scenario): scenario to fly in
+        episode_time (float): episode duration [s]
+        dt (float): fixed simulation timestep [s]
+        integrator (str): fleet integrator
+        record_stride (int): record the positions every stride steps
+
+    Returns:
+        tuple[AircraftFleet, TrajectoryRecorder, float]: fleet in its final state, recorded
+            positions and wall time of the episode [s]
+    """
+    capacity = episode_steps(episode_time, dt) // record_stride + 1
+    recorder = TrajectoryRecorder(np.arange(len(bank)), record_stride, ('pos',), capacity)
+    start = time.perf_counter()
+    fleet = run_episode(bank, scenario, episode_time, dt, recorder, integrator=integrator)
+    return fleet, recorder, time.perf_counter() - start
+
+
+def _percentiles(values: np.ndarray) -> dict[str, float]:
+    """Summarize a drift distribution
+
+    Args:
+        values (np.ndarray): drift per controller
+
+    Returns:
+        dict[str, float]: median, 95th percentile and maximum
+    """
+    return {'median': float(np.median(values)),
+            'p95': float(np.percentile(values, 95)),
+            'max': float(np.max(values))}
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Rank of each value (0 for the lowest)
+
+    Args:
+        values (np.ndarray): values
+
+    Returns:
+        np.ndarray: ranks
+    """
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values, kind='stable')] = np.arange(len(values))
+    return ranks
+
+
+def compare_precision(bank: ControllerBank, scenario: Scenario, episode_time: float = 85.0,
+                      dt: float = DEFAULT_DT, integrator: str = 'euler',
+                      record_stride: int = 1, top_fraction: float = 0.05) -> dict:
+    """Fly the same controllers in float64 and float32 and measure how far the results drift apart
+
+    The float32 run uses the float64 genomes rounded to float32, as a float32 training would store
+    them. Trajectories are compared over the samples in which the aircraft was simulated in both
+    runs.
+
+    Args:
+        bank (ControllerBank): controllers (float64)
+        scenario (Scenario): scenario to fly in
+        episode_time (float, optional): episode duration [s]. Defaults to 85.0.
+        dt (float, optional): fixed simulation timestep [s]. Defaults to DEFAULT_DT.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+        record_stride (int, optional): compare the positions every stride steps. Defaults to 1.
+        top_fraction (float, optional): fraction of best controllers whose selection is compared
+            (the elites of the GA). Defaults to 0.05.
+
+    Returns:
+        dict: report with the genome, trajectory, outcome, fitness and performance drift
+    """
+    bank = bank.astype(np.float64)
+    bank32 = bank.astype(np.float32)
+    fleet64, recorder64, seconds64 = fly(bank, scenario, episode_time, dt, integrator,
+                                         record_stride)
+    fleet32, recorder32, seconds32 = fly(bank32, scenario, episode_time, dt, integrator,
+                                         record_stride)
+    scores64, landed64 = score_episode(fleet64, scenario)
+    scores32, landed32 = score_episode(fleet32, scenario)
+
+    # Position drift over the samples recorded in both runs
+    lengths = np.minimum(recorder64.lengths, recorder32.lengths)
+    count = min(recorder64.count, recorder32.count)
+    distance = np.linalg.norm(recorder32.buffers['pos'][:count]
+                              - recorder64.buffers['pos'][:count], axis=-1)
+    distance[np.arange(count)[:, None] >= lengths] = 0.0
+    final_distance = np.linalg.norm(fleet32.pos - fleet64.pos, axis=1)
+
+    # Fitness drift and selection agreement
+    score_error = np.abs(scores32 - scores64)
+    relative_error = score_error / np.maximum(np.abs(scores64), 1.0)
+    top = max(1, int(top_fraction * len(bank)))
+    top64, top32 = top_indices(scores64, top), top_indices(scores32, top)
+    rank_correlation = np.corrcoef(_ranks(scores64), _ranks(scores32))[0, 1] \
+        if len(bank) > 1 else 1.0
+
+    def state_bytes(fleet: AircraftFleet) -> int:
+        return sum(array.nbytes for array in (fleet.pos, fleet.vel, fleet.pitch, fleet.pitch_rate,
+                                              fleet.thrust_setting, fleet.control_surface_angle,
+                                              fleet.wheel_brake, fleet.step_size))
+
+    return {
+        'controllers': len(bank),
+        'episode_time': episode_time,
+        'dt': dt,
+        'integrator': integrator,
+        'genome_rounding': float(np.max(np.abs(bank32.params - bank.params))),
+        'max_position_drift': _percentiles(distance.max(axis=0) if count else final_distance),
+        'final_position_drift': _percentiles(final_distance),
+        'same_steps': float(np.mean(fleet32.steps == fleet64.steps)),
+        'same_crashed': float(np.mean(fleet32.crashed == fleet64.crashed)),
+        'same_landed': float(np.mean(landed32 == landed64)),
+        'landed': [int(np.count_nonzero(landed64)), int(np.count_nonzero(landed32))],
+        'score_drift': _percentiles(score_error),
+        'relative_score_drift': _percentiles(relative_error),
+        'rank_correlation': float(rank_correlation),
+        'same_best': bool(np.argmax(scores64) == np.argmax(scores32)),
+        'top_overlap': len(np.intersect1d(top64, top32)) / top,
+        'seconds': [seconds64, seconds32],
+        'state_bytes': [state_bytes(fleet64), state_bytes(fleet32)],
+        'genome_bytes': [bank.params.nbytes, bank32.params.nbytes]
+    }
+
+
+def format_report(report: dict) -> str:
+    """Format a precision report as text
+
+    Args:
+        report (dict): report of compare_precision
+
+    Returns:
+        str: report
+    """
+    def drift(name: str, unit: str) -> str:
+        values = report[name]
+        return (f'median {values["median"]:.3g}{unit}, 95% {values["p95"]:.3g}{unit}, '
+                f'max {values["max"]:.3g}{unit}')
+
+    seconds64, seconds32 = report['seconds']
+    return '\n'.join([
+        f'float32 versus float64: {report["controllers"]} controllers, '
+        f'{report["episode_time"]:g} s episodes, dt {report["dt"]:.4g} s, '
+        f'{report["integrator"]} integrator',
+        f'  Genome rounding:       max {report["genome_rounding"]:.3g}',
+        f'  Max position drift:    {drift("max_position_drift", " m")}',
+        f'  Final position drift:  {drift("final_position_drift", " m")}',
+        f'  Same episode length:   {report["same_steps"]:.1%} of the aircraft',
+        f'  Same crash outcome:    {report["same_crashed"]:.1%} of the aircraft',
+        f'  Same landing outcome:  {report["same_landed"]:.1%} of the aircraft '
+        f'({report["landed"][0]} landed in float64, {report["landed"][1]} in float32)',
+        f'  Score drift:           {drift("score_drift", "")}',
+        f'  Relative score drift:  {drift("relative_score_drift", "")}',
+        f'  Score rank correlation: {report["rank_correlation"]:.4f}',
+        f'  Same best controller:  {"yes" if report["same_best"] else "no"}',
+        f'  Elite overlap:         {report["top_overlap"]:.1%}',
+        f'  Episode time:          {seconds64:.2f} s float64, {seconds32:.2f} s float32 '
+        f'({seconds64 / seconds32:.2f}x)',
+        f'  Fleet state:           {report["state_bytes"][0]} B float64, '
+        f'{report["state_bytes"][1]} B float32',
+        f'  Genomes:               {report["genome_bytes"][0]} B float64, '
+        f'{report["genome_bytes"][1]} B float32'
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the drift of float32 simulation from '
+                                                 'float64')
+    parser.add_argument('run', nargs='?', default=None,
+                        help='run folder whose best controllers to fly (default: random '
+                             'controllers)')
+    parser.add_argument('--population', type=int, default=1000,
+                        help='number of random controllers')
+    parser.add_argument('--episode-time', type=float, default=85.0, help='episode time [s]')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help='simulation timestep [s]')
+    parser.add_argument('--integrator', choices=INTEGRATORS, default='euler',
+                        help='integration scheme')
+    parser.add_argument('--record-stride', type=int, default=1,
+                        help='compare the positions every n steps')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--save', default=None, help='also save the report to this JSON file')
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    if args.run is not None:
+        bank = ControllerBank.load(checkpoints(args.run))
+    else:
+        bank = ControllerBank.random(args.population)
+    report = compare_precision(bank, default_scenario(), args.episode_time, args.dt,
+                               args.integrator, args.record_stride)
+    print(format_report(report))
+    if args.save is not None:
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
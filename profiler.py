@@ -0,0 +1,92 @@
+"""Per-phase timing of the training loops"""
+import csv
+import time
+
+from contextlib import nullcontext
+
+
+class _Phase:
+    """Context manager that adds its duration to a phase total"""
+
+    __slots__ = ('totals', 'name', 'start')
+
+    def __init__(self, totals: dict[str, float], name: str) -> None:
+        self.totals: dict[str, float] = totals
+        self.name: str = name
+        self.start: float = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.totals[self.name] = self.totals.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class PhaseTimer:
+    """Accumulates the wall-clock time spent in each phase of a loop, per generation
+
+    When disabled, phase() returns a shared no-op context manager, so instrumented code costs
+    (almost) nothing.
+    """
+
+    _DISABLED = nullcontext()
+
+    def __init__(self, enabled: bool = True) -> None:
+        """Create a timer
+
+        Args:
+            enabled (bool, optional): whether to measure. Defaults to True.
+        """
+        self.enabled: bool = enabled
+        self.current: dict[str, float] = {}        # [s] totals of the current generation
+        self.history: list[dict[str, float]] = []  # totals of completed generations
+
+    def phase(self, name: str) -> _Phase | nullcontext:
+        """Time a phase (use in a with-statement)
+
+        Args:
+            name (str): phase name
+
+        Returns:
+            _Phase | nullcontext: context manager
+        """
+        if not self.enabled:
+            return self._DISABLED
+        return _Phase(self.current, name)
+
+    def end_generation(self, generation: int) -> None:
+        """Store the totals of the current generation and start a new one
+
+        Args:
+            generation (int): generation number
+        """
+        if not self.enabled:
+            return
+        self.history.append({'generation': generation, **self.current})
+        self.current = {}
+
+    def save(self, filename: str) -> None:
+        """Save the totals per generation to a CSV file (one column per phase, in seconds)
+
+        Args:
+            filename (str): name of the file
+        """
+        if not self.enabled:
+            return
+        phases = list(dict.fromkeys(name for row in self.history for name in row))
+        with open(filename, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=phases, restval=0.0)
+            writer.writeheader()
+            writer.writerows(self.history)
+
+    def summary(self) -> list[str]:
+        """Describe the share of each phase in the current generation
+
+        Returns:
+            list[str]: one line per phase, largest first
+        """
+        total = sum(self.current.values())
+        if total == 0.0:
+            return []
+        return [f'{name}: {duration / total:.0%} ({duration:.1f} s)'
+                for name, duration in sorted(self.current.items(), key=lambda item: -item[1])]
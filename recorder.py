@@ -0,0 +1,177 @@
+"""Trajectory recording"""
+import numpy as np
+
+from fleet import AircraftFleet
+
+
+# Recorded channels (same as the replay.npz files) and their shape per aircraft
+CHANNELS = {
+    'pos': (2,),              # [m] position
+    'vel': (2,),              # [m/s] velocity
+    'pitch': (),              # [rad] pitch angle
+    'thrust': (),             # [-] thrust setting
+    'control_surface': (),    # [rad] control surface angle
+    'brake': ()               # [-] wheel brake setting
+}
+
+
+def _sources(fleet: AircraftFleet) -> dict[str, np.ndarray]:
+    """Get the fleet state array of every channel
+
+    Args:
+        fleet (AircraftFleet): fleet
+
+    Returns:
+        dict[str, np.ndarray]: state array per channel
+    """
+    return {
+        'pos': fleet.pos,
+        'vel': fleet.vel,
+        'pitch': fleet.pitch,
+        'thrust': fleet.thrust_setting,
+        'control_surface': fleet.control_surface_angle,
+        'brake': fleet.wheel_brake
+    }
+
+
+class TrajectoryRecorder:
+    """Records the trajectories of selected aircraft of a fleet into preallocated arrays
+
+    The arrays double in size if more samples are recorded than allocated. The last sample of the
+    trajectory of an aircraft that crashed or landed is always that terminal state, also if it
+    falls between strides, and finish adds the state at the end of the episode.
+    """
+
+    def __init__(self,
+                 indices: np.ndarray,
+                 stride: int = 1,
+                 channels: tuple[str, ...] = tuple(CHANNELS),
+                 capacity: int = 1024) -> None:
+        """Create a recorder
+
+        Args:
+            indices (np.ndarray): indices of the aircraft to record
+            stride (int, optional): record one sample every stride steps. Defaults to 1.
+            channels (tuple[str, ...], optional): channels to record. Defaults to all channels.
+            capacity (int, optional): number of samples to preallocate. Defaults to 1024.
+        """
+        unknown = set(channels) - set(CHANNELS)
+        if unknown:
+            raise ValueError(f'Unknown channels: {", ".join(sorted(unknown))}')
+        self.indices: np.ndarray = np.asarray(indices)
+        self.stride: int = stride
+        self.channels: tuple[str, ...] = tuple(channels)
+        self.capacity: int = max(capacity, 1)
+        self.count: int = 0  # number of recorded samples
+        self.lengths: np.ndarray = np.zeros(len(self.indices), dtype=int)  # valid samples per aircraft
+
+        self.time: np.ndarray = np.empty(self.capacity)
+        self.buffers: dict[str, np.ndarray] = {
+            channel: np.empty((self.capacity, len(self.indices), *CHANNELS[channel]))
+            for channel in self.channels
+        }
+        self._steps: int = 0
+
+        # Terminal states of aircraft that crashed or landed between strides (time is NaN if none)
+        self.final_time: np.ndarray = np.full(len(self.indices), np.nan)
+        self.final: dict[str, np.ndarray] = {
+            channel: np.empty((len(self.indices), *CHANNELS[channel]))
+            for channel in self.channels
+        }
+        self._active_count: int | None = None  # size of the active set at the previous step
+
+    def _grow(self) -> None:
+        """Double the capacity of the buffers"""
+        added = self.capacity
+        self.capacity += added
+        self.time = np.concatenate((self.time, np.empty(added)))
+        for channel, buffer in self.buffers.items():
+            self.buffers[channel] = np.concatenate((buffer, np.empty_like(buffer[:added])))
+
+    def record(self, fleet: AircraftFleet, time: float) -> None:
+        """Record a sample after a fleet step (only every stride steps, and terminal states)
+
+        Args:
+            fleet (AircraftFleet): fleet to record
+            time (float): simulation time [s]
+        """
+        self._steps += 1
+        shrunk = self._active_count is not None and fleet.active.size < self._active_count
+        self._active_count = fleet.active.size
+        sources = _sources(fleet)
+        if (self._steps - 1) % self.stride != 0:
+            # Keep the terminal state of aircraft that crashed or landed in this step
+            if shrunk:
+                stepped = np.flatnonzero(fleet.steps[self.indices] == fleet.step_count)
+                ended = stepped[~np.isin(self.indices[stepped], fleet.active)]
+                self.final_time[ended] = time
+                for channel, final in self.final.items():
+                    final[ended] = sources[channel][self.indices[ended]]
+            return
+        if self.count == self.capacity:
+            self._grow()
+
+        # Copy selected aircraft straight into the buffers
+        self.time[self.count] = time
+        for channel, buffer in self.buffers.items():
+            if sources[channel].dtype == buffer.dtype:
+                # (take with mode='raise' buffers its output, the indices are valid anyway)
+                np.take(sources[channel], self.indices, axis=0, out=buffer[self.count],
+                        mode='clip')
+            else:  # (take only writes to arrays of the same type, e.g. not from float32 fleets)
+                buffer[self.count] = sources[channel][self.indices]
+
+        # Samples stay valid until an aircraft is no longer simulated (crashed or landed)
+        stepped = fleet.steps[self.indices] == fleet.step_count
+        self.count += 1
+        self.lengths[stepped] = self.count
+
+    def trajectory(self, index: int) -> dict[str, np.ndarray]:
+        """Get the recorded trajectory of an aircraft
+
+        Args:
+            index (int): fleet index of the aircraft
+
+        Returns:
+            dict[str, np.ndarray]: time and channel histories
+        """
+        matches = np.flatnonzero(self.indices == index)
+        if matches.size == 0:
+            raise KeyError(f'Aircraft {index} is not recorded')
+        local = matches[0]
+        length = self.lengths[local]
+        trajectory = {'time': self.time[:length].copy()}
+        for channel, buffer in self.buffers.items():
+            trajectory[channel] = buffer[:length, local].copy()
+
+        # Append the terminal state if it was between strides
+        if not np.isnan(self.final_time[local]):
+            trajectory['time'] = np.append(trajectory['time'], self.final_time[local])
+            for channel, final in self.final.items():
+                trajectory[channel] = np.concatenate((trajectory[channel], final[local][None]))
+        return trajectory
+
+    def save(self, filename: str, index: int) -> None:
+        """Save the recorded trajectory of an aircraft (same format as replay.npz)
+
+        Args:
+            filename (str): name of the file
+            index (int): fleet index of the aircraft
+        """
+        np.savez(filename, **self.trajectory(index))
+
+    def finish(self, fleet: AircraftFleet, time: float) -> None:
+        """Keep the state at the end of the episode of aircraft that are still simulated, if the
+        last step fell between strides
+
+        Args:
+            fleet (AircraftFleet): fleet after its last step
+            time (float): simulation time of the last step [s]
+        """
+        if self._steps == 0 or (self._steps - 1) % self.stride == 0:
+            return  # the last step was recorded
+        sources = _sources(fleet)
+        flying = np.flatnonzero(np.isin(self.indices, fleet.active))
+        self.final_time[flying] = time
+        for channel, final in self.final.items():
+            final[flying] = sources[channel][self.indices[flying]]
@@ -0,0 +1,279 @@
+"""Cached rendering"""
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+
+import math
+import numpy as np
+import pygame as pg
+
+from collections import OrderedDict
+
+from camera import world_to_screen
+from fleet import AircraftFleet
+from terrain import Terrain
+
+
+class TerrainRenderer:
+    """Draws the terrain from pre-rendered tiles
+
+    The world is split into tiles of fixed width, which are rendered once (ground, oceans, runways,
+    mountains and distance markers) and cached. Every frame only the visible tiles are blitted.
+    """
+
+    TRANSPARENT = (255, 0, 255)  # color key for the sky part of tiles
+
+    def __init__(self, terrain: Terrain, tile_width: int = 1024, max_tiles: int = 64,
+                 marker_spacing: int = 300) -> None:
+        """Create a renderer for a terrain
+
+        Args:
+            terrain (Terrain): terrain to draw
+            tile_width (int, optional): tile width [px]. Defaults to 1024.
+            max_tiles (int, optional): maximum number of cached tiles. Defaults to 64.
+            marker_spacing (int, optional): distance between markers [m]. Defaults to 300.
+        """
+        self.terrain: Terrain = terrain
+        self.tile_width: int = tile_width
+        self.max_tiles: int = max_tiles
+        self.marker_spacing: int = marker_spacing
+
+        # Tiles reach from the highest mountain top to the tile depth below the ground
+        self.top: int = int(max((height for _, _, height in terrain.mountains), default=0)) + 1
+        self.depth: int = 0
+        self._tiles: OrderedDict[int, pg.Surface] = OrderedDict()
+        self._labels: dict[int, pg.Surface] = {}
+        self._font: pg.font.Font | None = None
+
+    def _label(self, x: int) -> pg.Surface:
+        """Get the (cached) text surface of a marker
+
+        Args:
+            x (int): marker x-coordinate (world position)
+
+        Returns:
+            pg.Surface: rendered text
+        """
+        if x not in self._labels:
+            if self._font is None:
+                self._font = pg.font.Font(None, 24)
+            self._labels[x] = self._font.render(str(x), True, (0, 0, 0))
+        return self._labels[x]
+
+    def _render_tile(self, index: int) -> pg.Surface:
+        """Render a single tile
+
+        Args:
+            index (int): tile index (tile starts at x = index * tile_width)
+
+        Returns:
+            pg.Surface: rendered tile
+        """
+        terrain = self.terrain
+        x0 = index * self.tile_width
+        x1 = x0 + self.tile_width
+        height = self.top + self.depth
+        tile = pg.Surface((self.tile_width, height))
+        tile.fill(self.TRANSPARENT)
+        tile.set_colorkey(self.TRANSPARENT)
+
+        # Draw basic ground, oceans and runways
+        pg.draw.rect(tile, terrain.ground_color, (0, self.top, self.tile_width, self.depth))
+        for collection, color in ((terrain.oceans, terrain.ocean_color),
+                                  (terrain.runways, terrain.runway_color)):
+            for start, end in collection:
+                if end >= x0 and start <= x1:
+                    pg.draw.rect(tile, color, (start - x0, self.top, end - start, self.depth))
+
+        # Draw mountains
+        for start, end, mountain_height in terrain.mountains:
+            if end >= x0 and start <= x1:
+                points = [(start - x0, self.top),
+                          ((start + end) / 2 - x0, self.top - mountain_height),
+                          (end - x0, self.top)]
+                pg.draw.polygon(tile, terrain.ground_color, points)
+
+        # Draw equally spaced markers (including those left of the tile whose text overlaps it)
+        line = pg.Surface((1, self.depth), pg.SRCALPHA)
+        line.fill((255, 255, 255, 50))
+        first = math.floor((x0 - self.marker_spacing) / self.marker_spacing) * self.marker_spacing
+        for x in range(first, x1, self.marker_spacing):
+            tile.blit(line, (x - x0, self.top))
+            tile.blit(self._label(x), (x - x0 + 5, self.top + 5))
+
+        # Match the display pixel format for fast blitting
+        if pg.display.get_surface() is not None:
+            tile = tile.convert()
+        return tile
+
+    def _tile(self, index: int) -> pg.Surface:
+        """Get a tile from the cache, rendering it if needed
+
+        Args:
+            index (int): tile index
+
+        Returns:
+            pg.Surface: rendered tile
+        """
+        tile = self._tiles.get(index)
+        if tile is None:
+            tile = self._render_tile(index)
+            self._tiles[index] = tile
+            if len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(index)
+        return tile
+
+    def draw(self, screen: pg.Surface, camera_pos: np.ndarray) -> None:
+        """Draw the visible part of the terrain on the screen
+
+        Args:
+            screen (pg.Surface): PyGame screen
+            camera_pos (np.ndarray): camera position in world coordinates
+        """
+        width, height = screen.get_size()
+        y_ground = world_to_screen(np.array([0.0, 0.0]), camera_pos, (width, height))[1]
+
+        # Re-render tiles if the visible part below the ground got deeper (e.g. window resized)
+        depth = math.ceil(height - y_ground)
+        if depth > self.depth:
+            self.depth = max(depth, 2 * self.depth, 256)
+            self._tiles.clear()
+
+        # Blit visible tiles
+        left = camera_pos[0] - width / 2
+        first = math.floor(left / self.tile_width)
+        last = math.floor((left + width) / self.tile_width)
+        for index in range(first, last + 1):
+            screen.blit(self._tile(index),
+                        (math.floor(index * self.tile_width - left), math.floor(y_ground) - self.top))
+
+
+class AircraftRenderer:
+    """Draws aircraft from cached pre-rotated sprites
+
+    Sprites are cached per color and quantized pitch angle. Positions are transformed to screen
+    space in one vectorized operation, aircraft outside the screen are skipped, and altitude labels
+    are only re-rendered every few frames.
+    """
+
+    LENGTH = 40  # [px] aircraft length
+    WIDTH = 20   # [px] aircraft width
+
+    def __init__(self, pitch_resolution: float = np.radians(1.0), label_interval: int = 10,
+                 max_sprites: int = 8192, show_labels: bool = True) -> None:
+        """Create an aircraft renderer
+
+        Args:
+            pitch_resolution (float, optional): pitch quantization step [rad]. Defaults to 1 degree.
+            label_interval (int, optional): frames between altitude label updates. Defaults to 10.
+            max_sprites (int, optional): maximum number of cached sprites. Defaults to 8192.
+            show_labels (bool, optional): whether to draw altitude labels. Defaults to True.
+        """
+        self.pitch_resolution: float = pitch_resolution
+        self.label_interval: int = label_interval
+        self.max_sprites: int = max_sprites
+        self.show_labels: bool = show_labels
+
+        self.sprite_size: int = 2 * math.ceil(math.hypot(self.LENGTH / 2, self.WIDTH / 2)) + 4
+        self._sprites: OrderedDict[tuple[int, int, int, int], pg.Surface] = OrderedDict()
+        self._labels: dict[int, pg.Surface] = {}
+        self._frame: int = 0
+
+    def _sprite(self, color: tuple[int, int, int], pitch_bin: int) -> pg.Surface:
+        """Get a (cached) aircraft sprite
+
+        Args:
+            color (tuple[int, int, int]): aircraft color
+            pitch_bin (int): quantized pitch angle (multiple of the pitch resolution)
+
+        Returns:
+            pg.Surface: sprite, centered on the aircraft position
+        """
+        key = (*color, pitch_bin)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            return sprite
+
+        # Define local aircraft shape and rotate it (y-axis pointing down on screen)
+        points = np.array([
+            [self.LENGTH / 2, 0],
+            [- self.LENGTH / 2, -self.WIDTH / 2],
+            [- self.LENGTH / 2, self.WIDTH / 2]
+        ])
+        pitch = pitch_bin * self.pitch_resolution
+        cos_pitch, sin_pitch = np.cos(pitch), np.sin(pitch)
+        rot_matrix = np.array([[cos_pitch, -sin_pitch], [sin_pitch, cos_pitch]])
+        rotated_points = points @ rot_matrix.T
+        sprite_points = rotated_points * (1, -1) + self.sprite_size / 2
+
+        # Draw aircraft shape
+        sprite = pg.Surface((self.sprite_size, self.sprite_size), pg.SRCALPHA)
+        pg.draw.polygon(sprite, color, sprite_points)
+        pg.draw.polygon(sprite, (0, 0, 0), sprite_points, width=2)
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def draw(self, screen: pg.Surface, camera_pos: np.ndarray, pos: np.ndarray, pitch: np.ndarray,
+             colors: np.ndarray, font: pg.font.Font, ids: np.ndarray | None = None) -> None:
+        """Draw a set of aircraft on screen
+
+        Args:
+            screen (pg.Surface): PyGame screen
+            camera_pos (np.ndarray): camera position in world coordinates
+            pos (np.ndarray): (n, 2) aircraft positions [m]
+            pitch (np.ndarray): (n,) aircraft pitch angles [rad]
+            colors (np.ndarray): (n, 3) aircraft colors
+            font (pg.font.Font): font for the altitude labels
+            ids (np.ndarray | None, optional): (n,) aircraft identifiers, used to cache their
+                labels between frames. Defaults to the aircraft order.
+        """
+        self._frame += 1
+        if ids is None:
+            ids = np.arange(len(pos))
+
+        # Transform all positions to screen space and skip aircraft outside the screen
+        width, height = screen.get_size()
+        screen_pos = (pos - camera_pos) * (1, -1) + (width / 2, height / 2)
+        margin = self.sprite_size + (60 if self.show_labels else 0)
+        visible = np.flatnonzero((screen_pos[:, 0] > -margin) & (screen_pos[:, 0] < width + margin) &
+                                 (screen_pos[:, 1] > -margin) & (screen_pos[:, 1] < height + margin))
+
+        # Draw aircraft sprites
+        pitch_bins = np.round(pitch[visible] / self.pitch_resolution).astype(int)
+        corners = np.floor(screen_pos[visible] - self.sprite_size / 2).astype(int)
+        for i, pitch_bin, corner in zip(visible, pitch_bins, corners):
+            screen.blit(self._sprite(tuple(colors[i]), pitch_bin), corner)
+
+        # Draw altitude labels (each aircraft updates its label once every label interval)
+        if not self.show_labels:
+            return
+        label_pos = np.floor(screen_pos[visible] - (self.LENGTH / 2, self.WIDTH)).astype(int)
+        for i, corner in zip(visible, label_pos):
+            aircraft_id = int(ids[i])
+            label = self._labels.get(aircraft_id)
+            if label is None or (self._frame + aircraft_id) % self.label_interval == 0:
+                label = font.render(f'{pos[i, 1]:.1f} m', True, (0, 0, 0))
+                self._labels[aircraft_id] = label
+            screen.blit(label, corner)
+
+    def draw_fleet(self, screen: pg.Surface, camera_pos: np.ndarray, fleet: AircraftFleet,
+                   font: pg.font.Font) -> None:
+        """Draw all aircraft of a fleet that have not crashed
+
+        Args:
+            screen (pg.Surface): PyGame screen
+            camera_pos (np.ndarray): camera position in world coordinates
+            fleet (AircraftFleet): fleet to draw
+            font (pg.font.Font): font for the altitude labels
+        """
+        alive = np.flatnonzero(~fleet.crashed)
+        self.draw(screen, camera_pos, fleet.pos[alive], fleet.pitch[alive], fleet.colors[alive],
+                  font, alive)
+
+    def reset_labels(self) -> None:
+        """Forget cached labels (e.g. when a new fleet is created)"""
+        self._labels.clear()
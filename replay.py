@@ -1,20 +1,162 @@
+import argparse
+import glob
 import os
+import re
 import time
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
 import pygame as pg
 import numpy as np
 
-from aircraft import Aircraft2D, AircraftConfig
-from environment import Environment
-from terrain import Terrain
-from controller import Controller
+from concurrent.futures import ProcessPoolExecutor
+
+from controller import ControllerBank
+from fleet import AircraftFleet
+from integrators import INTEGRATORS
+from recorder import TrajectoryRecorder
+from render import AircraftRenderer, TerrainRenderer
+from runstore import RunReader
+from scenario import Scenario, default_scenario
+from simulation import DEFAULT_DT, episode_steps, run_episode
 
 FILE = 'out\\20250826-212840\\best_gen41.npz'
+MAX_EPISODE_TIME = 85.0  # [s] longest episode flown during training
 
 np.random.seed(1)
 
-def main():
+
+def simulate(filenames: list[str], scenario: Scenario,
+             episode_time: float | list[float] = MAX_EPISODE_TIME, dt: float = DEFAULT_DT,
+             integrator: str = 'euler') -> list[dict[str, np.ndarray]]:
+    """Re-fly saved controllers headless, with a fixed timestep
+
+    Controllers with the same episode time fly in one fleet.
+
+    Args:
+        filenames (list[str]): controller files (best_gen*.npz)
+        scenario (Scenario): scenario to fly in
+        episode_time (float | list[float], optional): maximum episode duration, or one per
+            controller file [s]. Defaults to MAX_EPISODE_TIME.
+        dt (float, optional): fixed timestep [s]. Defaults to DEFAULT_DT.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+
+    Returns:
+        list[dict[str, np.ndarray]]: trajectory per controller (same format as replay.npz)
+    """
+    bank = ControllerBank.load(filenames)
+    episode_times = np.broadcast_to(np.asarray(episode_time, dtype=float), len(bank))
+    trajectories = [None] * len(bank)
+    for duration in np.unique(episode_times):
+        group = np.flatnonzero(episode_times == duration)
+        recorder = TrajectoryRecorder(np.arange(len(group)),
+                                      capacity=episode_steps(float(duration), dt))
+        run_episode(bank.subset(group), scenario, float(duration), dt, recorder,
+                    integrator=integrator)
+        for local, i in enumerate(group):
+            trajectories[i] = recorder.trajectory(local)
+    return trajectories
+
+
+def generation(filename: str) -> int:
+    """Get the generation of a controller file
+
+    Args:
+        filename (str): controller file (best_genN.npz)
+
+    Returns:
+        int: generation N
+    """
+    return int(re.search(r'best_gen(\d+)\.npz$', filename).group(1))
+
+
+def checkpoints(folder: str) -> list[str]:
+    """Get the controller files of a run, in generation order
+
+    Args:
+        folder (str): run folder
+
+    Returns:
+        list[str]: best_gen*.npz files
+    """
+    return sorted(glob.glob(os.path.join(folder, 'best_gen*.npz')), key=generation)
+
+
+def training_episode_times(filenames: list[str],
+                           default: float = MAX_EPISODE_TIME) -> list[float]:
+    """Get the episode time each controller was trained with, from the history of its run
+
+    Args:
+        filenames (list[str]): controller files (best_gen*.npz)
+        default (float, optional): episode time of controllers whose generation is not in the
+            run history [s]. Defaults to MAX_EPISODE_TIME.
+
+    Returns:
+        list[float]: episode time per controller file [s]
+    """
+    episode_times = []
+    histories = {}
+    for filename in filenames:
+        folder = os.path.dirname(filename)
+        if folder not in histories:
+            generations = RunReader(folder).generations()
+            histories[folder] = dict(zip(generations['generation'].tolist(),
+                                         generations['episode_time'].tolist()))
+        episode_times.append(histories[folder].get(generation(filename), default))
+    return episode_times
+
+
+def replay_run(folder: str, scenario: Scenario, episode_time: float | None = None,
+               dt: float = DEFAULT_DT, integrator: str = 'euler', workers: int = 1) -> list[str]:
+    """Re-fly every controller of a run and save each trajectory next to its controller file
+
+    The controller files are split over worker processes, which each fly their share.
+    best_genN.npz is saved as replay_genN.npz.
+
+    Args:
+        folder (str): run folder
+        scenario (Scenario): scenario to fly in
+        episode_time (float | None, optional): maximum episode duration [s]. Defaults to None (the
+            episode time of each generation in the run history).
+        dt (float, optional): fixed timestep [s]. Defaults to DEFAULT_DT.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+        workers (int, optional): number of worker processes. Defaults to 1.
+
+    Returns:
+        list[str]: names of the saved files
+    """
+    filenames = checkpoints(folder)
+    if episode_time is None:
+        episode_times = training_episode_times(filenames)
+    else:
+        episode_times = [episode_time] * len(filenames)
+    shards = [(list(shard), list(times))
+              for shard, times in zip(np.array_split(filenames, min(workers, len(filenames))),
+                                      np.array_split(episode_times, min(workers, len(filenames))))
+              if len(shard) > 0]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(simulate, shard, scenario, times, dt, integrator)
+                       for shard, times in shards]
+            trajectories = [trajectory for future in futures for trajectory in future.result()]
+    else:
+        trajectories = [trajectory for shard, times in shards
+                        for trajectory in simulate(shard, scenario, times, dt, integrator)]
+
+    # Save trajectories in the replay.npz format
+    saved = []
+    for filename, trajectory in zip(filenames, trajectories):
+        replay_file = os.path.join(folder, os.path.basename(filename).replace('best_', 'replay_'))
+        np.savez(replay_file, **trajectory)
+        saved.append(replay_file)
+    return saved
+
+
+def play(filename: str) -> None:
+    """Fly a saved controller in real time with visualization, and save its trajectory
+
+    Args:
+        filename (str): controller file
+    """
     # Initialize PyGame
     pg.init()
     screen = pg.display.set_mode((1200, 800), pg.RESIZABLE)
@@ -23,47 +165,20 @@ def main():
     font = pg.font.Font(None, 24)
     pg.display.set_caption('Aircraft simulation')
 
-    # Set terrain and environment parameters
-    oceans = [(2000, 5000)]
-    runways = [(-400, 1400), (5600, 7400)]
-    mountains = []
-    terrain = Terrain(oceans, runways, mountains)
-    environment = Environment(
-        air_density = 1.225,
-        gravity = 9.81
-    )
-
-    # Set aircraft parameters
-    config = AircraftConfig(
-        mass = 1000.0,
-        max_thrust = 5000.0,
-        reference_area = 10.0,
-        lift_curve_slope = 5.0,
-        parasite_drag_coefficient = 0.02,
-        induced_drag_factor = 0.05,
-        pitch_rate_gain = 2.0,
-        max_control_surface_angle = np.radians(15.0),
-        wheel_drag_coefficient = 0.1,
-        stall_angle = np.radians(15.0),
-        max_vertical_landing_speed = 10.0,
-        control_effectiveness_speed = 50.0,
-        max_wheel_brake_force = 15000
-    )
+    # Set terrain, environment and aircraft parameters
+    scenario = default_scenario()
+    terrain = scenario.terrain
+    environment = scenario.environment
+    config = scenario.config
+    terrain_renderer = TerrainRenderer(terrain)
+    aircraft_renderer = AircraftRenderer()
 
     # Create aircraft
-    aircraft = Aircraft2D(config, environment, terrain)
-    controller = Controller.load(FILE)
+    fleet = AircraftFleet(config, environment, terrain, 1)
+    bank = ControllerBank.load([filename])
+    recorder = TrajectoryRecorder(np.arange(1))
     time = 0.0
 
-    # Create history
-    pos_history = []
-    vel_history = []
-    pitch_history = []
-    thrust_history = []
-    control_surface_history = []
-    brake_history = []
-    time_history = []
-
     # Main loop
     running = True
     while running:
@@ -74,28 +189,17 @@ def main():
         fps = clock.get_fps()
 
         # Control aircraft using GA controllers
-        state = np.array([
-            aircraft.pos[0],
-            aircraft.pos[1],
-            aircraft.vel[0],
-            aircraft.vel[1],
-            aircraft.pitch,
-            aircraft.pitch_rate
-        ])
-        thrust_cmd, control_surface_cmd, brake_cmd = controller.forward(state)
-        aircraft.thrust_setting = thrust_cmd
-        aircraft.control_surface_angle = control_surface_cmd
-        aircraft.wheel_brake = brake_cmd
-        aircraft.step(dt)
+        fleet.set_controls(*bank.forward(fleet.state()))
+        fleet.step(dt)
             
         # Update camera position
-        camera_pos = np.array([aircraft.pos[0], camera_pos[1]])
+        camera_pos = np.array([fleet.pos[0, 0], camera_pos[1]])
 
         # Draw terrain
-        terrain.draw(screen, camera_pos)
+        terrain_renderer.draw(screen, camera_pos)
 
         # Draw aircraft
-        aircraft.draw(screen, camera_pos, font)
+        aircraft_renderer.draw_fleet(screen, camera_pos, fleet, font)
 
         # Draw FPS and max X position
         text = font.render(f'FPS: {fps:.0f}', True, (0, 0, 0))
@@ -112,38 +216,54 @@ def main():
                 screen = pg.display.set_mode((event.w, event.h), pg.RESIZABLE)
 
         # Handle end
-        if aircraft.on_ground and not aircraft.crashed and aircraft.vel[0] < 1.0 \
-            and aircraft.pos[0] > terrain.runways[1][0]:
+        if fleet.landed()[0]:
             running = False
 
         # Store history
-        time_history.append(time)
-        pos_history.append(aircraft.pos.copy())
-        vel_history.append(aircraft.vel.copy())
-        pitch_history.append(aircraft.pitch)
-        thrust_history.append(aircraft.thrust_setting)
-        control_surface_history.append(aircraft.control_surface_angle)
-        brake_history.append(aircraft.wheel_brake)
+        recorder.record(fleet, time)
 
     # Save history
-    pos_history = np.array(pos_history)
-    vel_history = np.array(vel_history)
-    pitch_history = np.array(pitch_history)
-    thrust_history = np.array(thrust_history)
-    control_surface_history = np.array(control_surface_history)
-    brake_history = np.array(brake_history)
-    np.savez(os.path.join(os.path.dirname(FILE), 'replay.npz'),
-        time=time_history,
-        pos=pos_history,
-        vel=vel_history,
-        pitch=pitch_history,
-        thrust=thrust_history,
-        control_surface=control_surface_history,
-        brake=brake_history
-    )
+    recorder.save(os.path.join(os.path.dirname(filename), 'replay.npz'), 0)
 
     pg.quit()
 
 
+def main():
+    parser = argparse.ArgumentParser(description='Fly saved controllers again')
+    parser.add_argument('path', nargs='?', default=FILE,
+                        help='controller file, or run folder to re-fly all controllers of')
+    parser.add_argument('--headless', action='store_true',
+                        help='simulate without visualization, with a fixed timestep')
+    parser.add_argument('--episode-time', type=float, default=None,
+                        help='maximum episode time of headless replays [s] (default: the episode '
+                             'time the controller was trained with)')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT,
+                        help='timestep of headless replays [s]')
+    parser.add_argument('--integrator', choices=INTEGRATORS, default='euler',
+                        help='integration scheme of headless replays')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes for run folders (0: one per CPU core)')
+    args = parser.parse_args()
+
+    # Visualize a single controller
+    if not os.path.isdir(args.path) and not args.headless:
+        play(args.path)
+        return
+
+    # Re-fly without visualization
+    scenario = default_scenario()
+    if os.path.isdir(args.path):
+        saved = replay_run(args.path, scenario, args.episode_time, args.dt, args.integrator,
+                           args.workers or os.cpu_count())
+        print(f'Saved {len(saved)} replays in {args.path}')
+    else:
+        if args.episode_time is None:
+            episode_time = training_episode_times([args.path])[0]
+        else:
+            episode_time = args.episode_time
+        trajectory = simulate([args.path], scenario, episode_time, args.dt, args.integrator)[0]
+        np.savez(os.path.join(os.path.dirname(args.path), 'replay.npz'), **trajectory)
+
+
 if __name__ == '__main__':
     main()
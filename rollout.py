@@ -0,0 +1,275 @@
+"""Episode rollout backends"""
+import numpy as np
+
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from cache import FitnessCache, scenario_key
+from controller import ControllerBank
+from evaluate import evaluate_fleet
+from fleet import AircraftFleet
+from recorder import CHANNELS, TrajectoryRecorder
+from scenario import Scenario, ScenarioBatch
+from simulation import episode_steps, run_episode
+from viewer import FleetSnapshot
+
+
+# Largest recording of the positions of all aircraft during an episode; larger populations only
+# record the best controller, by flying it again
+RECORD_ALL_MAX_BYTES = 256 * 2**20
+
+@dataclass
+class RolloutResult:
+    scores: np.ndarray     # [-] fitness score per controller
+    landed: np.ndarray     # whether each aircraft came to a stop on the landing runway
+    best: int              # index of the best controller
+    best_trajectory: dict[str, np.ndarray]  # recorded time and channels of the best aircraft
+    trajectories: dict[int, dict[str, np.ndarray]] = field(default_factory=dict)  # top individuals
+
+
+def top_indices(scores: np.ndarray, count: int) -> np.ndarray:
+    """Indices of the highest scores, best first (ties resolve like np.argmax)
+
+    Args:
+        scores (np.ndarray): scores
+        count (int): number of indices
+
+    Returns:
+        np.ndarray: indices
+    """
+    return np.argsort(-scores, kind='stable')[:count]
+
+
+def score_episode(fleet: AircraftFleet,
+                  scenario: Scenario | ScenarioBatch) -> tuple[np.ndarray, np.ndarray]:
+    """Score the controllers of a fleet after an episode
+
+    For a scenario batch, the scores of each controller are aggregated over the scenarios, and a
+    controller only counts as landed if it landed in every scenario.
+
+    Args:
+        fleet (AircraftFleet): fleet after the episode
+        scenario (Scenario | ScenarioBatch): scenario(s) the fleet flew in
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: score and landed flag per controller
+    """
+    scores = evaluate_fleet(fleet, fleet.terrain)
+    if isinstance(scenario, ScenarioBatch):
+        return scenario.aggregate(scores), fleet.landed().reshape(len(scenario), -1).all(axis=0)
+    return scores, fleet.landed()
+
+
+def record_trajectories(bank: ControllerBank, scenario: Scenario | ScenarioBatch,
+                        episode_time: float, dt: float, record_stride: int = 1,
+                        channels: tuple[str, ...] = tuple(CHANNELS),
+                        integrator: str = 'euler') -> list[dict[str, np.ndarray]]:
+    """Fly one episode for every controller in the bank and record their trajectories
+
+    For a scenario batch, the trajectories are those in the first scenario.
+
+    Args:
+        bank (ControllerBank): controllers to record
+        scenario (Scenario | ScenarioBatch): scenario(s) to fly in
+        episode_time (float): simulated episode duration [s]
+        dt (float): fixed timestep [s]
+        record_stride (int, optional): record one sample every stride steps. Defaults to 1.
+        channels (tuple[str, ...], optional): channels to record. Defaults to all channels.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+
+    Returns:
+        list[dict[str, np.ndarray]]: recorded time and channels per controller
+    """
+    capacity = -(-episode_steps(episode_time, dt) // record_stride)
+    recorder = TrajectoryRecorder(np.arange(len(bank)), record_stride, channels, capacity)
+    run_episode(bank, scenario, episode_time, dt, recorder, integrator=integrator)
+    return [recorder.trajectory(i) for i in range(len(bank))]
+
+
+def rollout(bank: ControllerBank, scenario: Scenario | ScenarioBatch, episode_time: float,
+            dt: float, record_stride: int = 1, record_top: int | None = None,
+            snapshot: FleetSnapshot | None = None, integrator: str = 'euler') -> RolloutResult:
+    """Fly and score one episode for every controller in the bank (in this process)
+
+    By default the positions of all aircraft are recorded during the episode, unless that takes
+    more than RECORD_ALL_MAX_BYTES; then the best controller is flown again with its positions
+    recorded. With record_top, nothing is recorded during the episode; instead the best controllers
+    are flown again with all channels recorded. The simulation is deterministic, so flying again
+    gives the same trajectories while keeping memory independent of the population size. For a
+    scenario batch, the trajectories are those in the first scenario.
+
+    Args:
+        bank (ControllerBank): controllers to evaluate
+        scenario (Scenario | ScenarioBatch): scenario(s) to fly in
+        episode_time (float): simulated episode duration [s]
+        dt (float): fixed timestep [s]
+        record_stride (int, optional): record one sample every stride steps. Defaults to 1.
+        record_top (int | None, optional): number of best controllers to record. Defaults to None.
+        snapshot (FleetSnapshot | None, optional): live viewer buffer. Defaults to None.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+
+    Returns:
+        RolloutResult: scores and best trajectories
+    """
+    capacity = -(-episode_steps(episode_time, dt) // record_stride)
+    record_all = capacity * len(bank) * 2 * np.dtype(float).itemsize <= RECORD_ALL_MAX_BYTES
+    if record_top is None and record_all:
+        recorder = TrajectoryRecorder(np.arange(len(bank)), record_stride, ('pos',), capacity)
+    else:
+        recorder = None
+    fleet = run_episode(bank, scenario, episode_time, dt, recorder, snapshot, integrator)
+    scores, landed = score_episode(fleet, scenario)
+    best = int(np.argmax(scores))
+    if recorder is not None:
+        return RolloutResult(scores, landed, best, recorder.trajectory(best))
+    if record_top is None:
+        best_trajectory, = record_trajectories(bank.subset(np.array([best])), scenario,
+                                               episode_time, dt, record_stride, ('pos',),
+                                               integrator)
+        return RolloutResult(scores, landed, best, best_trajectory)
+
+    # Fly the best controllers again, recording their full trajectories
+    top = top_indices(scores, record_top)
+    trajectories = dict(zip(top.tolist(), record_trajectories(
+        bank.subset(top), scenario, episode_time, dt, record_stride, integrator=integrator)))
+    return RolloutResult(scores, landed, best, trajectories[best], trajectories)
+
+
+class ParallelRollout:
+    """Rollout backend that splits the population into shards over a process pool
+
+    Aircraft and controllers do not interact, so the merged result is identical to a serial rollout.
+    """
+
+    def __init__(self, workers: int) -> None:
+        """Create a process pool
+
+        Args:
+            workers (int): number of worker processes
+        """
+        self.workers: int = workers
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(workers)
+
+    def __call__(self, bank: ControllerBank, scenario: Scenario | ScenarioBatch,
+                 episode_time: float, dt: float, record_stride: int = 1,
+                 record_top: int | None = None, snapshot: FleetSnapshot | None = None,
+                 integrator: str = 'euler') -> RolloutResult:
+        """Fly and score one episode for every controller in the bank
+
+        Args:
+            bank (ControllerBank): controllers to evaluate
+            scenario (Scenario | ScenarioBatch): scenario(s) to fly in
+            episode_time (float): simulated episode duration [s]
+            dt (float): fixed timestep [s]
+            record_stride (int, optional): record one sample every stride steps. Defaults to 1.
+            record_top (int | None, optional): number of best controllers to record.
+                Defaults to None.
+            snapshot (FleetSnapshot | None, optional): live viewer buffer, each worker writes its
+                own shard. Defaults to None.
+            integrator (str, optional): fleet integrator. Defaults to 'euler'.
+
+        Returns:
+            RolloutResult: scores and best trajectories
+        """
+        bounds = np.linspace(0, len(bank), min(self.workers, len(bank)) + 1).astype(int)
+        futures = [self.executor.submit(rollout, bank.subset(slice(start, end)), scenario,
+                                        episode_time, dt, record_stride, record_top,
+                                        None if snapshot is None else snapshot.shard(start),
+                                        integrator)
+                   for start, end in zip(bounds[:-1], bounds[1:])]
+        shards = [future.result() for future in futures]
+
+        # Merge shards in population order (so ties resolve like np.argmax on all scores)
+        scores = np.concatenate([shard.scores for shard in shards])
+        landed = np.concatenate([shard.landed for shard in shards])
+        best = int(np.argmax(scores))
+        shard = np.searchsorted(bounds, best, side='right') - 1
+
+        # Every shard recorded its own top individuals, which include the overall top
+        trajectories = {}
+        if record_top is not None:
+            recorded = {start + index: trajectory
+                        for start, shard_result in zip(bounds, shards)
+                        for index, trajectory in shard_result.trajectories.items()}
+            trajectories = {int(index): recorded[index]
+                            for index in top_indices(scores, record_top)}
+        return RolloutResult(scores, landed, best, shards[shard].best_trajectory,
+                             trajectories)
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        self.executor.shutdown()
+
+
+class CachedRollout:
+    """Rollout backend that only simulates controllers whose score is not in a fitness cache
+
+    The simulation is deterministic, so a controller flown in the same scenario with the same
+    episode time and timestep always gets the same score. Cached controllers are only flown again
+    if their trajectory is needed (e.g. when one of them is the best).
+    """
+
+    def __init__(self, backend: Callable[..., RolloutResult], cache: FitnessCache) -> None:
+        """Wrap a rollout backend
+
+        Args:
+            backend (Callable[..., RolloutResult]): backend for the controllers that are not cached
+            cache (FitnessCache): fitness cache
+        """
+        self.backend: Callable[..., RolloutResult] = backend
+        self.cache: FitnessCache = cache
+
+    def __call__(self, bank: ControllerBank, scenario: Scenario | ScenarioBatch,
+                 episode_time: float, dt: float, record_stride: int = 1,
+                 record_top: int | None = None, snapshot: FleetSnapshot | None = None,
+                 integrator: str = 'euler') -> RolloutResult:
+        """Fly and score one episode for every controller in the bank that is not cached
+
+        Args:
+            bank (ControllerBank): controllers to evaluate
+            scenario (Scenario | ScenarioBatch): scenario(s) to fly in
+            episode_time (float): simulated episode duration [s]
+            dt (float): fixed timestep [s]
+            record_stride (int, optional): record one sample every stride steps. Defaults to 1.
+            record_top (int | None, optional): number of best controllers to record.
+                Defaults to None.
+            snapshot (FleetSnapshot | None, optional): live viewer buffer, written in population
+                order. Defaults to None.
+            integrator (str, optional): fleet integrator. Defaults to 'euler'.
+
+        Returns:
+            RolloutResult: scores and best trajectories
+        """
+        keys = self.cache.keys(bank.params, (scenario_key(scenario), episode_time, dt, integrator))
+        found, scores, landed = self.cache.lookup(keys)
+
+        # Simulate controllers that are not cached (cached controllers are not shown as flying)
+        missing = np.flatnonzero(~found)
+        recorded = {}
+        if snapshot is not None:
+            snapshot.hide(np.flatnonzero(found))
+            snapshot = snapshot.subset(missing)
+        if missing.size > 0:
+            result = self.backend(bank.subset(missing), scenario, episode_time, dt,
+                                  record_stride, record_top, snapshot, integrator)
+            scores[missing] = result.scores
+            landed[missing] = result.landed
+            self.cache.store([keys[i] for i in missing], result.scores, result.landed)
+            recorded = {int(missing[result.best]): result.best_trajectory}
+            recorded.update({int(missing[index]): trajectory
+                             for index, trajectory in result.trajectories.items()})
+
+        # Fly cached controllers again if their trajectories are needed (recording the same
+        # channels as the backend)
+        best = int(np.argmax(scores))
+        needed = [best] if record_top is None else [int(i) for i in top_indices(scores, record_top)]
+        replay = [index for index in needed if index not in recorded]
+        if replay:
+            channels = ('pos',) if record_top is None else tuple(CHANNELS)
+            recorded.update(zip(replay, record_trajectories(
+                bank.subset(np.array(replay)), scenario, episode_time, dt, record_stride,
+                channels, integrator)))
+
+        trajectories = {} if record_top is None else {index: recorded[index] for index in needed}
+        return RolloutResult(scores, landed, best, recorded[best], trajectories)
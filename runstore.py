@@ -0,0 +1,155 @@
+"""Append-only storage of the training history"""
+import os
+
+import numpy as np
+
+
+# Statistics stored per generation (one fixed-size record per generation in the index file)
+GENERATION_DTYPE = np.dtype([
+    ('generation', np.int64),
+    ('episode_time', np.float64),  # [s] episode duration
+    ('best', np.float64),          # [-] best score
+    ('mean', np.float64),          # [-] mean score
+    ('median', np.float64),        # [-] median score
+    ('std', np.float64),           # [-] standard deviation of the scores
+    ('worst', np.float64),         # [-] worst score
+    ('landed', np.int64),          # number of aircraft that landed
+    ('path_start', np.int64),      # first sample of the best trajectory in the path file
+    ('path_length', np.int64)      # number of samples of the best trajectory
+])
+
+# Trajectory sample of the best aircraft (channels that were not recorded are NaN)
+SAMPLE_DTYPE = np.dtype([
+    ('time', np.float64),             # [s] simulation time
+    ('pos', np.float64, (2,)),        # [m] position
+    ('vel', np.float64, (2,)),        # [m/s] velocity
+    ('pitch', np.float64),            # [rad] pitch angle
+    ('thrust', np.float64),           # [-] thrust setting
+    ('control_surface', np.float64),  # [rad] control surface angle
+    ('brake', np.float64)             # [-] wheel brake setting
+])
+
+INDEX_FILE = 'generations.bin'
+PATH_FILE = 'paths.bin'
+
+
+class RunWriter:
+    """Appends the statistics and best trajectory of each generation to a run folder
+
+    Each generation is flushed to disk as soon as it is appended, so an interrupted run keeps all
+    completed generations. The trajectory samples are written before the index record that refers
+    to them, so readers never see a generation whose trajectory is incomplete.
+    """
+
+    def __init__(self, folder: str) -> None:
+        """Create a run store (or append to an existing one)
+
+        Args:
+            folder (str): run folder
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.folder: str = folder
+        self._index = open(os.path.join(folder, INDEX_FILE), 'ab')
+        self._paths = open(os.path.join(folder, PATH_FILE), 'ab')
+        self._path_count: int = self._paths.tell() // SAMPLE_DTYPE.itemsize
+
+    def append(self, generation: int, episode_time: float, scores: np.ndarray,
+               landed: np.ndarray, trajectory: dict[str, np.ndarray]) -> None:
+        """Append a generation
+
+        Args:
+            generation (int): generation number
+            episode_time (float): episode duration [s]
+            scores (np.ndarray): score per aircraft
+            landed (np.ndarray): whether each aircraft landed
+            trajectory (dict[str, np.ndarray]): best trajectory, with at least the 'pos' channel
+        """
+        # Write the trajectory samples
+        length = len(trajectory['pos'])
+        samples = np.full(length, np.nan, dtype=SAMPLE_DTYPE)
+        for channel, values in trajectory.items():
+            samples[channel] = values
+        self._paths.write(samples.tobytes())
+        self._paths.flush()
+
+        # Write the index record
+        scores = np.asarray(scores)
+        record = np.array((generation, episode_time, scores.max(), scores.mean(), np.median(scores),
+                           scores.std(), scores.min(), np.count_nonzero(landed),
+                           self._path_count, length), dtype=GENERATION_DTYPE)
+        self._index.write(record.tobytes())
+        self._index.flush()
+        self._path_count += length
+
+    def close(self) -> None:
+        """Close the files"""
+        self._index.close()
+        self._paths.close()
+
+    def __enter__(self) -> "RunWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RunReader:
+    """Reads a run folder written by RunWriter, also while the run is still going
+
+    Files are memory-mapped, so only the requested generations and trajectories are loaded.
+    """
+
+    def __init__(self, folder: str) -> None:
+        """Open a run folder
+
+        Args:
+            folder (str): run folder
+        """
+        self.folder: str = folder
+
+    def _map(self, filename: str, dtype: np.dtype, start: int = 0) -> np.ndarray:
+        """Memory-map the complete records of a file
+
+        Args:
+            filename (str): file name within the run folder
+            dtype (np.dtype): record type
+            start (int, optional): first record to map. Defaults to 0.
+
+        Returns:
+            np.ndarray: (read-only) records from start
+        """
+        path = os.path.join(self.folder, filename)
+        count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if start >= count:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype, 'r', start * dtype.itemsize, (count - start,))
+
+    def __len__(self) -> int:
+        return len(self._map(INDEX_FILE, GENERATION_DTYPE))
+
+    def generations(self, start: int = 0) -> np.ndarray:
+        """Get the statistics of the completed generations
+
+        Args:
+            start (int, optional): index of the first generation to read (to only read generations
+                that were added since an earlier call). Defaults to 0.
+
+        Returns:
+            np.ndarray: record per generation (see GENERATION_DTYPE)
+        """
+        return self._map(INDEX_FILE, GENERATION_DTYPE, start)
+
+    def trajectory(self, index: int = -1) -> dict[str, np.ndarray]:
+        """Get the best trajectory of a generation
+
+        Args:
+            index (int, optional): index of the generation (negative counts from the last completed
+                generation). Defaults to -1.
+
+        Returns:
+            dict[str, np.ndarray]: time and channel histories (same format as replay.npz)
+        """
+        record = self.generations()[index]
+        start, length = int(record['path_start']), int(record['path_length'])
+        samples = self._map(PATH_FILE, SAMPLE_DTYPE, start)[:length]
+        return {channel: np.array(samples[channel]) for channel in SAMPLE_DTYPE.names}
@@ -0,0 +1,192 @@
+"""Simulation scenario definitions"""
+import numpy as np
+
+from dataclasses import dataclass, fields, replace
+
+from aircraft import AircraftConfig
+from environment import Environment
+from terrain import Terrain, TerrainBatch
+
+
+AGGREGATIONS = ('mean', 'min', 'quantile')
+
+
+@dataclass
+class Scenario:
+    config: AircraftConfig
+    environment: Environment
+    terrain: Terrain
+
+
+def _values(parameters: list[AircraftConfig | Environment], name: str) -> float | np.ndarray:
+    """Get the value of a parameter in each of a set of parameter sets
+
+    Args:
+        parameters (list[AircraftConfig | Environment]): parameter sets
+        name (str): parameter name
+
+    Returns:
+        float | np.ndarray: the shared value if all sets have the same value, otherwise the value
+            per set
+    """
+    values = [getattr(parameter_set, name) for parameter_set in parameters]
+    return values[0] if all(value == values[0] for value in values) else np.array(values)
+
+
+def _take(values: float | np.ndarray, ids: np.ndarray) -> float | np.ndarray:
+    """Get the values of a parameter for a set of aircraft
+
+    Args:
+        values (float | np.ndarray): shared value or value per scenario
+        ids (np.ndarray): scenario index of each aircraft
+
+    Returns:
+        float | np.ndarray: shared value or value per aircraft
+    """
+    return values[ids] if isinstance(values, np.ndarray) else values
+
+
+class ScenarioBatch:
+    """Set of scenarios that every controller is flown in at once
+
+    A fleet for a batch of scenarios has one aircraft per controller and scenario (scenario-major:
+    aircraft s * n + i flies controller i in scenario s). Their scores are aggregated into one score
+    per controller.
+    """
+
+    def __init__(self, scenarios: list[Scenario], aggregation: str = 'mean',
+                 quantile: float = 0.1) -> None:
+        """Create a scenario batch
+
+        Args:
+            scenarios (list[Scenario]): scenarios (all terrains with the same number of runways)
+            aggregation (str, optional): how to combine the scores of a controller over the
+                scenarios ('mean', 'min' or 'quantile'). Defaults to 'mean'.
+            quantile (float, optional): quantile of the 'quantile' aggregation. Defaults to 0.1.
+        """
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f'Unknown aggregation {aggregation!r}, choose from {AGGREGATIONS}')
+        self.scenarios: list[Scenario] = scenarios
+        self.aggregation: str = aggregation
+        self.quantile: float = quantile
+
+        # Parameter values per scenario (a single value if all scenarios share it)
+        self._config_values: dict[str, float | np.ndarray] = {
+            field.name: _values([scenario.config for scenario in scenarios], field.name)
+            for field in fields(AircraftConfig)}
+        self._environment_values: dict[str, float | np.ndarray] = {
+            field.name: _values([scenario.environment for scenario in scenarios], field.name)
+            for field in fields(Environment)}
+
+    def __len__(self) -> int:
+        return len(self.scenarios)
+
+    def parameters(self, ids: np.ndarray) -> tuple[AircraftConfig, Environment, TerrainBatch]:
+        """Get the parameters of a set of aircraft
+
+        Args:
+            ids (np.ndarray): scenario index of each aircraft
+
+        Returns:
+            tuple[AircraftConfig, Environment, TerrainBatch]: aircraft, environment and terrain
+                parameters, with one value per aircraft (or one shared value for parameters that
+                are the same in every scenario)
+        """
+        config = AircraftConfig(**{name: _take(values, ids)
+                                   for name, values in self._config_values.items()})
+        environment = Environment(**{name: _take(values, ids)
+                                     for name, values in self._environment_values.items()})
+        return config, environment, TerrainBatch([s.terrain for s in self.scenarios], ids)
+
+    def aggregate(self, values: np.ndarray) -> np.ndarray:
+        """Combine per-aircraft scores into one score per controller
+
+        Args:
+            values (np.ndarray): (scenarios * n,) scores, scenario-major
+
+        Returns:
+            np.ndarray: (n,) aggregated scores
+        """
+        values = values.reshape(len(self.scenarios), -1)
+        if self.aggregation == 'mean':
+            return values.mean(axis=0)
+        if self.aggregation == 'min':
+            return values.min(axis=0)
+        return np.quantile(values, self.quantile, axis=0)
+
+
+def default_scenario() -> Scenario:
+    """Create the default scenario: take off, cross the ocean and land on the second runway
+
+    Returns:
+        Scenario: default scenario
+    """
+    # Set terrain and environment parameters
+    oceans = [(2000, 5000)]
+    runways = [(-400, 1400), (5600, 7400)]
+    mountains = []
+    terrain = Terrain(oceans, runways, mountains)
+    environment = Environment(
+        air_density = 1.225,
+        gravity = 9.81
+    )
+
+    # Set aircraft parameters
+    config = AircraftConfig(
+        mass = 1000.0,
+        max_thrust = 5000.0,
+        reference_area = 10.0,
+        lift_curve_slope = 5.0,
+        parasite_drag_coefficient = 0.02,
+        induced_drag_factor = 0.05,
+        pitch_rate_gain = 2.0,
+        max_control_surface_angle = np.radians(15.0),
+        wheel_drag_coefficient = 0.1,
+        stall_angle = np.radians(15.0),
+        max_vertical_landing_speed = 10.0,
+        control_effectiveness_speed = 50.0,
+        max_wheel_brake_force = 15000
+    )
+    return Scenario(config, environment, terrain)
+
+
+def random_scenarios(count: int, seed: int = 0, aggregation: str = 'mean',
+                     quantile: float = 0.1) -> ScenarioBatch:
+    """Create the default scenario and count - 1 random variations of it
+
+    The variations move the runways and ocean, may place a mountain before the ocean, and change the
+    air density and aircraft mass.
+
+    Args:
+        count (int): number of scenarios
+        seed (int, optional): seed of the variations. Defaults to 0.
+        aggregation (str, optional): score aggregation ('mean', 'min' or 'quantile').
+            Defaults to 'mean'.
+        quantile (float, optional): quantile of the 'quantile' aggregation. Defaults to 0.1.
+
+    Returns:
+        ScenarioBatch: scenarios
+    """
+    rng = np.random.default_rng(seed)  # independent of the training random state
+    base = default_scenario()
+    scenarios = [base]
+    for _ in range(count - 1):
+        # Move the runways and ocean
+        takeoff_end = round(rng.uniform(1200, 1600))
+        landing_start = round(rng.uniform(5000, 6200))
+        landing_end = landing_start + round(rng.uniform(1500, 2000))
+        ocean_start = takeoff_end + round(rng.uniform(400, 800))
+        ocean_end = landing_start - round(rng.uniform(400, 800))
+        mountains = []
+        if rng.random() < 0.5:
+            start = round(rng.uniform(takeoff_end + 100, ocean_start - 300))
+            mountains.append((start, start + round(rng.uniform(200, 300)),
+                              round(rng.uniform(20, 60))))
+        runways = [(-400, takeoff_end), (landing_start, landing_end)]
+        terrain = Terrain([(ocean_start, ocean_end)], runways, mountains)
+
+        # Change the air density and mass
+        environment = replace(base.environment, air_density=rng.uniform(1.0, 1.3))
+        config = replace(base.config, mass=rng.uniform(900.0, 1150.0))
+        scenarios.append(Scenario(config, environment, terrain))
+    return ScenarioBatch(scenarios, aggregation, quantile)
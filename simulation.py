@@ -0,0 +1,94 @@
+"""Headless fixed-timestep simulation"""
+import numpy as np
+
+from controller import ControllerBank, ForwardBuffers
+from fleet import DEFAULT_CHUNK_SIZE, AircraftFleet
+from recorder import TrajectoryRecorder
+from scenario import Scenario, ScenarioBatch
+from viewer import FleetSnapshot
+
+
+DEFAULT_DT = 1 / 60  # [s] nominal frame time of the visualization
+
+
+def run_episode(bank: ControllerBank, scenario: Scenario | ScenarioBatch, episode_time: float,
+                dt: float = DEFAULT_DT, recorder: TrajectoryRecorder | None = None,
+                snapshot: FleetSnapshot | None = None, integrator: str = 'euler',
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> AircraftFleet:
+    """Fly one episode for every controller in the bank, without display or clock
+
+    The episode ends early once every aircraft has crashed or landed. For a scenario batch, every
+    controller flies one aircraft in each scenario (aircraft s * n + i flies controller i in
+    scenario s), all in one fleet. The fleet is simulated in the precision of the controller
+    parameters.
+
+    Inference and physics process the active aircraft in chunks, with preallocated buffers, so the
+    memory used per step does not grow with the population size.
+
+    Args:
+        bank (ControllerBank): controllers, one aircraft each (per scenario)
+        scenario (Scenario | ScenarioBatch): aircraft, environment and terrain parameters
+        episode_time (float): simulated episode duration [s]
+        dt (float, optional): fixed timestep [s]. Defaults to DEFAULT_DT.
+        recorder (TrajectoryRecorder | None, optional): recorder to call after every step and at
+            the end of the episode. Defaults to None.
+        snapshot (FleetSnapshot | None, optional): live viewer buffer to publish the fleet state
+            to (the first scenario of a batch). Defaults to None.
+        integrator (str, optional): fleet integrator ('euler', 'rk4' or 'adaptive').
+            Defaults to 'euler'.
+        chunk_size (int, optional): number of aircraft processed at a time.
+            Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        AircraftFleet: fleet in its final state
+    """
+    size = len(bank)
+    if isinstance(scenario, ScenarioBatch):
+        fleet = AircraftFleet.from_scenarios(scenario, size, integrator, dtype=bank.params.dtype,
+                                             chunk_size=chunk_size)
+        bank = bank.subset(np.tile(np.arange(size), len(scenario)))
+    else:
+        fleet = AircraftFleet(scenario.config, scenario.environment, scenario.terrain, size,
+                              integrator, dtype=bank.params.dtype, chunk_size=chunk_size)
+    buffers = ForwardBuffers(min(chunk_size, len(fleet)), *bank.sizes, bank.params.dtype)
+    active_params = None  # parameters of the active controllers (allocated once they change)
+    active_bank = bank
+    for step in range(episode_steps(episode_time, dt)):
+        if fleet.active.size == 0:
+            break
+
+        # Only run inference for active aircraft (the active set only shrinks)
+        if len(active_bank) != fleet.active.size:
+            count = fleet.active.size
+            if active_params is None:
+                active_params = np.empty((count, bank.n_params), bank.params.dtype)
+            # (take with mode='raise' buffers its output, the indices are valid anyway)
+            np.take(bank.params, fleet.active, axis=0, out=active_params[:count], mode='clip')
+            active_bank = ControllerBank(active_params[:count], *bank.sizes)
+        for start in range(0, fleet.active.size, chunk_size):
+            rows = slice(start, start + chunk_size)
+            indices = fleet.active[rows]
+            commands = active_bank.forward_chunk(fleet.state(indices, buffers.inputs), rows,
+                                                 buffers)
+            fleet.set_controls(*commands, indices)
+        fleet.step(dt)
+        if recorder is not None:
+            recorder.record(fleet, (step + 1) * dt)
+        if snapshot is not None:
+            snapshot.publish(fleet, (step + 1) * dt, size)
+    if recorder is not None:
+        recorder.finish(fleet, fleet.step_count * dt)
+    return fleet
+
+
+def episode_steps(episode_time: float, dt: float) -> int:
+    """Number of fixed timesteps in an episode
+
+    Args:
+        episode_time (float): simulated episode duration [s]
+        dt (float): fixed timestep [s]
+
+    Returns:
+        int: number of steps
+    """
+    return round(episode_time / dt)
@@ -0,0 +1,206 @@
+"""Asynchronous steady-state training: no generation barriers between workers"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from controller import ControllerBank
+from genetic import GeneticAlgorithm
+from integrators import INTEGRATORS
+from rollout import rollout
+from runstore import RunWriter
+from scenario import Scenario, default_scenario
+from simulation import DEFAULT_DT
+
+
+class SteadyStateGA(GeneticAlgorithm):
+    """Genetic algorithm that keeps one pool of the best controllers found so far
+
+    New controllers are bred from the elites of the pool in small batches, whenever a worker is
+    free, and replace the worst controllers of the pool as soon as they are scored. The generation
+    counter increases every population_size evaluations.
+    """
+
+    def __init__(self,
+                 population_size: int = 50,
+                 elite_fraction: float = 0.2,
+                 mutation_rate: float = 0.1,
+                 workers: int = 1,
+                 batch_size: int = 50) -> None:
+        """Create a new algorithm instance
+
+        Args:
+            population_size (int, optional): size of the pool. Defaults to 50.
+            elite_fraction (float, optional): fraction of the pool that is bred from.
+                Defaults to 0.2.
+            mutation_rate (float, optional): mutation rate. Defaults to 0.1.
+            workers (int, optional): number of worker processes. Defaults to 1.
+            batch_size (int, optional): number of controllers flown per task (smaller batches
+                keep the pool fresher, larger batches simulate more efficiently). Defaults to 50.
+        """
+        super().__init__(population_size, elite_fraction, mutation_rate, workers)
+        self.batch_size: int = batch_size
+
+    def breed(self, pool: ControllerBank, scores: np.ndarray, count: int) -> ControllerBank:
+        """Breed new controllers from the elites of the pool
+
+        Like next_generation, new controllers are either mutants of the best controller (at twice
+        the mutation rate) or mutated children of random pairs of elites, in the same proportion.
+
+        Args:
+            pool (ControllerBank): scored controllers
+            scores (np.ndarray): score per controller
+            count (int): number of controllers to breed
+
+        Returns:
+            ControllerBank: new controllers
+        """
+        elite_count = min(int(self.elite_fraction * self.population_size), len(pool))
+        elites = pool.params[np.argsort(-scores, kind='stable')[:elite_count]]
+
+        # Crossover random pairs of elites, or copy the best controller
+        parent1, parent2 = self.select_parents(elite_count, count)
+        params = self.crossover(elites[parent1], elites[parent2])
+        mutants = np.random.rand(count) * (self.population_size - elite_count) < elite_count
+        params[mutants] = elites[0]
+
+        # Mutate (mutants at twice the mutation rate)
+        rates = np.where(mutants, 2 * self.mutation_rate, self.mutation_rate)
+        params += rates[:, None] * np.random.randn(count, pool.n_params)
+        return ControllerBank(params, *pool.sizes)
+
+
+def train_steady_state(ga: SteadyStateGA,
+                       scenario: Scenario,
+                       out_folder: str,
+                       episode_time: float = 85.0,
+                       max_generations: int = 100,
+                       dt: float = DEFAULT_DT,
+                       integrator: str = 'euler') -> list[float]:
+    """Train controllers asynchronously until an aircraft lands or the generation limit is reached
+
+    Every worker flies one batch at a time. When a batch is done, its controllers enter the pool
+    and a new batch is bred from the pool and submitted right away. Episodes end as soon as all
+    aircraft of a batch crashed or landed, so no worker waits for slow aircraft of other batches.
+    Scores of different episode times cannot be compared, so the episode time is fixed.
+
+    Args:
+        ga (SteadyStateGA): genetic algorithm
+        scenario (Scenario): scenario to train in
+        out_folder (str): folder to store the best controllers and run history in
+        episode_time (float, optional): episode duration [s]. Defaults to 85.0.
+        max_generations (int, optional): last generation (population_size evaluations each) to
+            run. Defaults to 100.
+        dt (float, optional): fixed simulation timestep [s]. Defaults to DEFAULT_DT.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+
+    Returns:
+        list[float]: best score in the pool after every generation
+    """
+    initial = ControllerBank.random(ga.population_size)
+    pool = initial.subset(slice(0, 0))
+    scores = np.empty(0)
+    landed = np.empty(0, dtype=bool)
+    submitted = 0  # number of initial controllers submitted
+    evaluations = 0
+    best_trajectory = None
+    best_scores = []
+    history = RunWriter(out_folder)
+    elite_count = int(ga.elite_fraction * ga.population_size)
+    executor = ProcessPoolExecutor(ga.workers)
+    futures: dict[Future, ControllerBank] = {}
+
+    def submit() -> None:
+        """Keep every worker busy with a batch (initial controllers first, then bred ones)"""
+        nonlocal submitted
+        while len(futures) < ga.workers:
+            if submitted < len(initial):
+                batch = initial.subset(slice(submitted, submitted + ga.batch_size))
+                submitted += len(batch)
+            elif len(pool) >= max(elite_count, 2):
+                batch = ga.breed(pool, scores, ga.batch_size)
+            else:
+                return  # wait for enough scored controllers to breed from
+            futures[executor.submit(rollout, batch, scenario, episode_time, dt,
+                                    integrator=integrator)] = batch
+
+    try:
+        submit()
+        done = False
+        while not done:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = futures.pop(future)
+                result = future.result()
+                evaluations += len(batch)
+                if best_trajectory is None or result.scores[result.best] > scores.max():
+                    best_trajectory = result.best_trajectory
+
+                # Keep the best controllers of the pool and the batch
+                params = np.concatenate((pool.params, batch.params))
+                all_scores = np.concatenate((scores, result.scores))
+                keep = np.argsort(-all_scores, kind='stable')[:ga.population_size]
+                pool = ControllerBank(params[keep], *pool.sizes)
+                scores = all_scores[keep]
+                landed = np.concatenate((landed, result.landed))[keep]
+
+                # Store the pool after every population_size evaluations (and at the end)
+                done = (result.landed.any()
+                        or evaluations >= (max_generations + 1) * ga.population_size)
+                if evaluations >= (ga.generation + 1) * ga.population_size or done:
+                    best = int(np.argmax(scores))
+                    pool.save(os.path.join(out_folder, f'best_gen{ga.generation}.npz'), best)
+                    print(f'Generation {ga.generation} best score: {scores[best]:.2f} '
+                          f'({evaluations} evaluations)')
+                    best_scores.append(scores[best])
+                    history.append(ga.generation, episode_time, scores, landed, best_trajectory)
+                    ga.generation += 1
+                if done:
+                    break
+            if not done:
+                submit()
+    finally:
+        executor.shutdown(cancel_futures=True)
+        history.close()
+    return best_scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train aircraft controllers asynchronously')
+    parser.add_argument('--population', type=int, default=200, help='pool size')
+    parser.add_argument('--elite-fraction', type=float, default=0.05, help='elite fraction')
+    parser.add_argument('--mutation-rate', type=float, default=0.09, help='mutation rate')
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help='number of controllers flown per task')
+    parser.add_argument('--generations', type=int, default=100,
+                        help='maximum generation (population size evaluations each)')
+    parser.add_argument('--episode-time', type=float, default=85.0, help='episode time [s]')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help='simulation timestep [s]')
+    parser.add_argument('--integrator', choices=INTEGRATORS, default='euler',
+                        help='integration scheme')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of worker processes (0: one per CPU core)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--out', default=os.path.join('out', time.strftime('%Y%m%d-%H%M%S')),
+                        help='output folder')
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    os.makedirs(args.out, exist_ok=True)
+    ga = SteadyStateGA(population_size=args.population,
+                       elite_fraction=args.elite_fraction,
+                       mutation_rate=args.mutation_rate,
+                       workers=args.workers or os.cpu_count(),
+                       batch_size=args.batch_size)
+    train_steady_state(ga, default_scenario(), args.out,
+                       episode_time=args.episode_time,
+                       max_generations=args.generations,
+                       dt=args.dt,
+                       integrator=args.integrator)
+
+
+if __name__ == '__main__':
+    main()
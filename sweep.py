@@ -0,0 +1,237 @@
+"""Hyperparameter sweeps over parallel headless trainings"""
+import argparse
+import csv
+import itertools
+import os
+import time
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, fields, replace
+
+from genetic import GeneticAlgorithm
+from integrators import INTEGRATORS
+from runstore import RunReader
+from scenario import default_scenario
+from simulation import DEFAULT_DT
+from train import train
+
+
+@dataclass(frozen=True)
+class Trial:
+    population_size: int = 200      # [-] population size
+    elite_fraction: float = 0.05    # [-] fraction of the population kept as elites
+    mutation_rate: float = 0.09     # [-] mutation noise scale
+    episode_time: float = 30.0      # [s] initial episode duration
+    episode_time_step: float = 1.0  # [s] episode duration increase per generation
+    max_episode_time: float = 85.0  # [s] maximum episode duration
+    seed: int = 1                   # random seed
+
+
+PARAMETERS = tuple(field.name for field in fields(Trial) if field.name != 'seed')
+COLUMNS = ('trial', *(field.name for field in fields(Trial)),
+           'generation', 'best', 'mean', 'landed')
+RESULTS_FILE = 'results.csv'
+
+
+def grid_search(space: dict[str, list], seeds: list[int]) -> list[Trial]:
+    """Create a trial for every combination of parameter values and seeds
+
+    Args:
+        space (dict[str, list]): values per parameter (other parameters keep their default)
+        seeds (list[int]): random seeds
+
+    Returns:
+        list[Trial]: trials
+    """
+    names = list(space)
+    return [Trial(**dict(zip(names, values)), seed=seed)
+            for values in itertools.product(*space.values()) for seed in seeds]
+
+
+def random_search(space: dict[str, list], count: int, seeds: list[int],
+                  random_seed: int = 0) -> list[Trial]:
+    """Create trials with parameters drawn uniformly between the lowest and highest given value
+
+    Args:
+        space (dict[str, list]): values per parameter (other parameters keep their default)
+        count (int): number of parameter sets
+        seeds (list[int]): random seeds (each parameter set is trained once per seed)
+        random_seed (int, optional): seed of the parameter draws. Defaults to 0.
+
+    Returns:
+        list[Trial]: trials
+    """
+    rng = np.random.RandomState(random_seed)  # independent of the training random state
+    trials = []
+    for _ in range(count):
+        trial = Trial()
+        for name, values in space.items():
+            value = rng.uniform(min(values), max(values))
+            trial = replace(trial, **{name: round(value) if name == 'population_size' else value})
+        trials.extend(replace(trial, seed=seed) for seed in seeds)
+    return trials
+
+
+def trial_error(trial: Trial) -> str | None:
+    """Check whether a trial can train
+
+    Args:
+        trial (Trial): trial parameters
+
+    Returns:
+        str | None: reason the trial cannot train, or None if it is valid
+    """
+    elite_count = int(trial.elite_fraction * trial.population_size)
+    if elite_count < 2:
+        return f'{elite_count} elites, crossover needs at least 2'
+    return None
+
+
+def run_trial(trial: Trial, out_folder: str, max_generations: int = 100, dt: float = DEFAULT_DT,
+              integrator: str = 'euler', cache_size: int = 10000) -> np.ndarray:
+    """Train with the parameters of a trial
+
+    Args:
+        trial (Trial): trial parameters
+        out_folder (str): folder to store the best controllers and run history in
+        max_generations (int, optional): last generation to run. Defaults to 100.
+        dt (float, optional): fixed simulation timestep [s]. Defaults to DEFAULT_DT.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+        cache_size (int, optional): fitness cache size. Defaults to 10000.
+
+    Returns:
+        np.ndarray: statistics per generation (see runstore.GENERATION_DTYPE)
+    """
+    np.random.seed(trial.seed)
+    os.makedirs(out_folder, exist_ok=True)
+    ga = GeneticAlgorithm(population_size=trial.population_size,
+                          elite_fraction=trial.elite_fraction,
+                          mutation_rate=trial.mutation_rate,
+                          cache_size=cache_size)
+    train(ga, default_scenario(), out_folder,
+          episode_time=trial.episode_time,
+          episode_time_step=trial.episode_time_step,
+          max_episode_time=trial.max_episode_time,
+          max_generations=max_generations,
+          dt=dt,
+          integrator=integrator,
+          verbose=False)
+    return np.array(RunReader(out_folder).generations())
+
+
+def sweep(trials: list[Trial], out_folder: str, workers: int = 1, max_generations: int = 100,
+          dt: float = DEFAULT_DT, integrator: str = 'euler', cache_size: int = 10000) -> str:
+    """Run trials concurrently and collect their score curves in one results table
+
+    Every trial trains in its own process and run folder (trial0, trial1, ...). The table has one
+    row per trial and generation, and is written as trials finish, so an interrupted sweep keeps
+    the completed trials. Invalid trials are skipped, and a failing trial is reported without
+    stopping the others; neither has rows in the table.
+
+    Args:
+        trials (list[Trial]): trials to run
+        out_folder (str): sweep folder
+        workers (int, optional): number of trials to run at the same time. Defaults to 1.
+        max_generations (int, optional): last generation of every trial. Defaults to 100.
+        dt (float, optional): fixed simulation timestep [s]. Defaults to DEFAULT_DT.
+        integrator (str, optional): fleet integrator. Defaults to 'euler'.
+        cache_size (int, optional): fitness cache size per trial. Defaults to 10000.
+
+    Returns:
+        str: name of the results table (CSV)
+    """
+    os.makedirs(out_folder, exist_ok=True)
+    filename = os.path.join(out_folder, RESULTS_FILE)
+    with open(filename, 'w', newline='') as file, ProcessPoolExecutor(workers) as executor:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        writer.writeheader()
+        futures = {}
+        for i, trial in enumerate(trials):
+            error = trial_error(trial)
+            if error is not None:
+                print(f'Trial {i} ({trial}) skipped: {error}')
+                continue
+            futures[executor.submit(run_trial, trial, os.path.join(out_folder, f'trial{i}'),
+                                    max_generations, dt, integrator, cache_size)] = i
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                generations = future.result()
+            except Exception as error:
+                print(f'Trial {i} ({trials[i]}) failed: {type(error).__name__}: {error}')
+                continue
+            writer.writerows({'trial': i, **asdict(trials[i]),
+                              'generation': int(record['generation']),
+                              'best': float(record['best']),
+                              'mean': float(record['mean']),
+                              'landed': int(record['landed'])} for record in generations)
+            file.flush()
+            landing = generations_to_landing(generations)
+            print(f'Trial {i} ({trials[i]}): '
+                  f'{"no landing" if landing is None else f"landed in generation {landing}"}')
+    return filename
+
+
+def generations_to_landing(generations: np.ndarray) -> int | None:
+    """Get the first generation in which an aircraft landed
+
+    Args:
+        generations (np.ndarray): statistics per generation (with generation and landed fields)
+
+    Returns:
+        int | None: generation number, or None if no aircraft landed
+    """
+    landed = np.flatnonzero(generations['landed'] > 0)
+    return int(generations['generation'][landed[0]]) if landed.size > 0 else None
+
+
+def load_results(filename: str) -> np.ndarray:
+    """Load a results table
+
+    Args:
+        filename (str): results table (CSV)
+
+    Returns:
+        np.ndarray: structured array with one record per trial and generation (see COLUMNS)
+    """
+    return np.genfromtxt(filename, delimiter=',', names=True, ndmin=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep genetic algorithm hyperparameters')
+    defaults = Trial()
+    for name in PARAMETERS:
+        parser.add_argument(f'--{name.replace("_", "-")}', type=type(getattr(defaults, name)),
+                            nargs='+', default=[getattr(defaults, name)],
+                            help=f'values of {name} (default: {getattr(defaults, name)})')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1], help='random seeds')
+    parser.add_argument('--random', type=int, default=None,
+                        help='draw this many parameter sets between the lowest and highest given '
+                             'values, instead of using every combination')
+    parser.add_argument('--generations', type=int, default=100, help='maximum generation')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help='simulation timestep [s]')
+    parser.add_argument('--integrator', choices=INTEGRATORS, default='euler',
+                        help='integration scheme')
+    parser.add_argument('--cache-size', type=int, default=10000,
+                        help='number of scores to cache per trial (0: no cache)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of trials to run at the same time (0: one per CPU core)')
+    parser.add_argument('--out', default=os.path.join('out', time.strftime('sweep-%Y%m%d-%H%M%S')),
+                        help='output folder')
+    args = parser.parse_args()
+
+    space = {name: getattr(args, name) for name in PARAMETERS}
+    if args.random is None:
+        trials = grid_search(space, args.seeds)
+    else:
+        trials = random_search(space, args.random, args.seeds)
+    print(f'Running {len(trials)} trials')
+    filename = sweep(trials, args.out, args.workers or os.cpu_count(), args.generations, args.dt,
+                     args.integrator, args.cache_size)
+    print(f'Results saved to {filename}')
+
+
+if __name__ == '__main__':
+    main()
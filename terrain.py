@@ -2,9 +2,49 @@
 import numpy as np
 import pygame as pg
 
+from copy import copy
+
 from camera import world_to_screen
 
 
+def _merge_intervals(regions: list[tuple[int, int]]) -> tuple[np.ndarray, np.ndarray]:
+    """Merge (start, end) regions into sorted, disjoint intervals
+
+    Args:
+        regions (list[tuple[int, int]]): (start, end) tuples
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: interval starts, interval ends
+    """
+    merged: list[list[float]] = []
+    for start, end in sorted(regions):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    intervals = np.array(merged, dtype=float).reshape(-1, 2)
+    return intervals[:, 0], intervals[:, 1]
+
+
+def _in_intervals(x: int | float | np.ndarray,
+                  starts: np.ndarray, ends: np.ndarray) -> bool | np.ndarray:
+    """Whether x-coordinates lie in one of a set of sorted, disjoint (closed) intervals
+
+    Args:
+        x (int | float | np.ndarray): x-coordinate(s)
+        starts (np.ndarray): interval starts
+        ends (np.ndarray): interval ends
+
+    Returns:
+        bool | np.ndarray: whether each x-coordinate is in an interval
+    """
+    x = np.asarray(x)
+    interval = np.searchsorted(starts, x, side='right') - 1
+    inside = (interval >= 0) & (x <= ends[np.maximum(interval, 0)]) if len(starts) > 0 \
+        else np.zeros(x.shape, dtype=bool)
+    return bool(inside) if inside.ndim == 0 else inside
+
+
 class Terrain:
 
     def __init__(self,
@@ -31,50 +71,78 @@ class Terrain:
         self.ocean_color: tuple[int, int, int] = ocean_color
         self.runway_color: tuple[int, int, int] = runway_color
         self.ground_color: tuple[int, int, int] = ground_color
+        self._compile()
 
-    def is_ocean(self, x: int | float) -> bool:
+    def _compile(self) -> None:
+        """Compile the oceans, runways and mountains into sorted interval indices"""
+        self._ocean_index: tuple[np.ndarray, np.ndarray] = _merge_intervals(self.oceans)
+        self._runway_index: tuple[np.ndarray, np.ndarray] = _merge_intervals(self.runways)
+
+        # Group overlapping mountains into clusters (padded with copies of their first mountain)
+        mountains = sorted(self.mountains)
+        clusters: list[list[tuple[int, int, int]]] = []
+        for mountain in mountains:
+            if clusters and mountain[0] <= max(end for _, end, _ in clusters[-1]):
+                clusters[-1].append(mountain)
+            else:
+                clusters.append([mountain])
+        size = max((len(cluster) for cluster in clusters), default=1)
+        members = np.array([cluster + cluster[:1] * (size - len(cluster)) for cluster in clusters],
+                           dtype=float).reshape(len(clusters), size, 3)
+        self._mountain_starts: np.ndarray = members[:, 0, 0]
+        self._mountain_ends: np.ndarray = members[..., 1].max(axis=1)
+        self._mountain_members: np.ndarray = members
+
+    def is_ocean(self, x: int | float | np.ndarray) -> bool | np.ndarray:
         """Whether the given x-coordinate is in an ocean region
 
         Args:
-            x (int | float): x-coordinate (world position)
+            x (int | float | np.ndarray): x-coordinate(s) (world position)
 
         Returns:
-            bool: whether the x-coordinate is in an ocean region
+            bool | np.ndarray: whether the x-coordinate is in an ocean region
         """
-        return any(start <= x <= end for start, end in self.oceans)
+        return _in_intervals(x, *self._ocean_index)
     
-    def is_runway(self, x: int | float) -> bool:
+    def is_runway(self, x: int | float | np.ndarray) -> bool | np.ndarray:
         """Whether the given x-coordinate is in a runway
 
         Args:
-            x (int | float): x-coordinate (world position)
+            x (int | float | np.ndarray): x-coordinate(s) (world position)
 
         Returns:
-            bool: whether the x-coordinate is in a runway
+            bool | np.ndarray: whether the x-coordinate is in a runway
         """
-        return any(start <= x <= end for start, end in self.runways)
+        return _in_intervals(x, *self._runway_index)
     
-    def hit_mountain(self, x: int | float, y: int | float) -> bool:
+    def hit_mountain(self, x: int | float | np.ndarray,
+                     y: int | float | np.ndarray) -> bool | np.ndarray:
         """Whether the given (x, y) position hits a mountain
 
         Args:
-            x (int | float): x-coordinate (world position)
-            y (int | float): y-coordinate (world position)
+            x (int | float | np.ndarray): x-coordinate(s) (world position)
+            y (int | float | np.ndarray): y-coordinate(s) (world position)
 
         Returns:
-            bool: whether the (x, y) position hits a mountain
+            bool | np.ndarray: whether the (x, y) position hits a mountain
         """
-        for start, end, height in self.mountains:
-            if x < start or x > end:
-                continue
+        x_arr, y_arr = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        hit = np.zeros(x_arr.shape, dtype=bool)
+        if len(self._mountain_starts) > 0:
+            # Find the cluster of mountains that could contain each x-coordinate
+            cluster = np.searchsorted(self._mountain_starts, x_arr, side='right') - 1
+            candidate = (cluster >= 0) & (x_arr <= self._mountain_ends[np.maximum(cluster, 0)])
+            xc, yc = x_arr[candidate, None], y_arr[candidate, None]
+            start, end, height = np.moveaxis(self._mountain_members[cluster[candidate]], -1, 0)
+
+            # Check the height of each mountain in the cluster
             peak_x = (start + end) / 2
-            if x <= peak_x:
-                mountain_y = (x - start) / (peak_x - start) * height
-            else:
-                mountain_y = (end - x) / (end - peak_x) * height
-            if y <= mountain_y:
-                return True
-        return False
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mountain_y = np.where(xc <= peak_x,
+                                      (xc - start) / (peak_x - start) * height,
+                                      (end - xc) / (end - peak_x) * height)
+            hit[candidate] = ((start <= xc) & (xc <= end) & (yc <= mountain_y)).any(axis=1)
+        return bool(hit) if hit.ndim == 0 else hit
     
     def _draw_collection(self, screen: pg.Surface, camera_pos: np.ndarray,
                          collection: list[tuple[int, int]], color: tuple[int, int, int]) -> None:
@@ -142,3 +210,157 @@ class Terrain:
             screen.blit(line_surface, (screen_x, y_ground))
             text = pg.font.Font(None, 24).render(str(x), True, (0, 0, 0))
             screen.blit(text, (screen_x + 5, y_ground + 5))
+
+
+def _interval_table(indices: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    """Pad the interval indices of several terrains into one table
+
+    Args:
+        indices (list[tuple[np.ndarray, np.ndarray]]): interval starts and ends per terrain
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (intervals, terrains) starts and ends (padding never contains
+            an x-coordinate)
+    """
+    count = max((len(starts) for starts, _ in indices), default=0)
+    starts = np.full((count, len(indices)), np.inf)
+    ends = np.full((count, len(indices)), -np.inf)
+    for i, (terrain_starts, terrain_ends) in enumerate(indices):
+        starts[:len(terrain_starts), i] = terrain_starts
+        ends[:len(terrain_ends), i] = terrain_ends
+    return starts, ends
+
+
+class TerrainBatch:
+    """Terrains of a set of aircraft (each aircraft has one of several terrains)
+
+    Has the query interface of Terrain, for x- and y-coordinates with one value per aircraft. The
+    runway bounds are per-aircraft arrays, so runways[1][0] gives the landing runway start of every
+    aircraft.
+
+    The intervals and mountains of all terrains are compiled once into tables with one column per
+    terrain (padded with empty entries), so a query looks up the entries of every aircraft by its
+    terrain index, without a loop over the terrains.
+    """
+
+    def __init__(self, terrains: list[Terrain], ids: np.ndarray) -> None:
+        """Create a terrain batch
+
+        Args:
+            terrains (list[Terrain]): terrains (all with the same number of runways)
+            ids (np.ndarray): terrain index of each aircraft
+        """
+        if len({len(terrain.runways) for terrain in terrains}) > 1:
+            raise ValueError('All terrains need the same number of runways')
+        self.terrains: list[Terrain] = terrains
+
+        # (runways, 2, terrains) runway bounds
+        runways = np.array([terrain.runways for terrain in terrains], dtype=float)
+        self._runway_bounds: np.ndarray = np.ascontiguousarray(
+            runways.reshape(len(terrains), -1, 2).transpose(1, 2, 0))
+
+        # (intervals, terrains) merged ocean and runway intervals
+        self._ocean_table: tuple[np.ndarray, np.ndarray] = _interval_table(
+            [terrain._ocean_index for terrain in terrains])
+        self._runway_table: tuple[np.ndarray, np.ndarray] = _interval_table(
+            [terrain._runway_index for terrain in terrains])
+
+        # (mountains, 3, terrains) start, end and height (padding never contains an x-coordinate)
+        count = max((len(terrain.mountains) for terrain in terrains), default=0)
+        mountains = np.tile([np.inf, -np.inf, 0.0], (len(terrains), count, 1))
+        for i, terrain in enumerate(terrains):
+            if terrain.mountains:
+                mountains[i, :len(terrain.mountains)] = terrain.mountains
+        self._mountain_table: np.ndarray = np.ascontiguousarray(mountains.transpose(1, 2, 0))
+        self._select(ids)
+
+    def _select(self, ids: np.ndarray) -> None:
+        """Set the terrain index of each aircraft
+
+        Args:
+            ids (np.ndarray): terrain index of each aircraft
+        """
+        self.ids: np.ndarray = np.asarray(ids)
+        self.runways: list[tuple[np.ndarray, np.ndarray]] = [
+            (starts[self.ids], ends[self.ids]) for starts, ends in self._runway_bounds]
+
+    def subset(self, aircraft: np.ndarray | slice) -> "TerrainBatch":
+        """Get the terrains of a subset of the aircraft (sharing the compiled tables)
+
+        Args:
+            aircraft (np.ndarray | slice): indices of the aircraft
+
+        Returns:
+            TerrainBatch: terrain batch
+        """
+        batch = copy(self)
+        batch._select(self.ids[aircraft])
+        return batch
+
+    def _in_intervals(self, x: np.ndarray, table: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        """Whether each aircraft's x-coordinate lies in one of the intervals of its terrain
+
+        The intervals of a terrain are disjoint, so this gives the same result as the sorted
+        interval search of Terrain.
+
+        Args:
+            x (np.ndarray): x-coordinate per aircraft
+            table (tuple[np.ndarray, np.ndarray]): (intervals, terrains) interval starts and ends
+
+        Returns:
+            np.ndarray: whether each x-coordinate is in an interval
+        """
+        inside = np.zeros(len(self.ids), dtype=bool)
+        for starts, ends in zip(*table):
+            inside |= (starts[self.ids] <= x) & (x <= ends[self.ids])
+        return inside
+
+    def is_ocean(self, x: np.ndarray) -> np.ndarray:
+        """Whether each aircraft's x-coordinate is in an ocean region of its terrain
+
+        Args:
+            x (np.ndarray): x-coordinate per aircraft
+
+        Returns:
+            np.ndarray: whether each x-coordinate is in an ocean region
+        """
+        return self._in_intervals(x, self._ocean_table)
+
+    def is_runway(self, x: np.ndarray) -> np.ndarray:
+        """Whether each aircraft's x-coordinate is in a runway of its terrain
+
+        Args:
+            x (np.ndarray): x-coordinate per aircraft
+
+        Returns:
+            np.ndarray: whether each x-coordinate is in a runway
+        """
+        return self._in_intervals(x, self._runway_table)
+
+    def hit_mountain(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Whether each aircraft's position hits a mountain of its terrain
+
+        Checks every mountain of the terrain, which gives the same result as the cluster search of
+        Terrain (a mountain can only be hit between its start and end).
+
+        Args:
+            x (np.ndarray): x-coordinate per aircraft
+            y (np.ndarray): y-coordinate per aircraft
+
+        Returns:
+            np.ndarray: whether each position hits a mountain
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        hit = np.zeros(len(self.ids), dtype=bool)
+        for mountain in self._mountain_table:
+            start, end, height = (values[self.ids] for values in mountain)
+
+            # Check the height of the mountain (as Terrain.hit_mountain)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                peak_x = (start + end) / 2
+                mountain_y = np.where(x <= peak_x,
+                                      (x - start) / (peak_x - start) * height,
+                                      (end - x) / (end - peak_x) * height)
+            hit |= (start <= x) & (x <= end) & (y <= mountain_y)
+        return hit
@@ -0,0 +1,185 @@
+"""Headless training of aircraft controllers"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from controller import ControllerBank
+from genetic import GeneticAlgorithm
+from integrators import INTEGRATORS
+from profiler import PhaseTimer
+from runstore import RunWriter
+from scenario import AGGREGATIONS, Scenario, ScenarioBatch, default_scenario, random_scenarios
+from simulation import DEFAULT_DT
+from viewer import Viewer
+
+
+def train(ga: GeneticAlgorithm,
+          scenario: Scenario | ScenarioBatch,
+          out_folder: str,
+          episode_time: float = 30.0,
+          episode_time_step: float = 1.0,
+          max_episode_time: float = 85.0,
+          max_generations: int = 100,
+          dt: float = DEFAULT_DT,
+          record_stride: int = 1,
+          record_top: int | None = None,
+          viewer: Viewer | None = None,
+          integrator: str = 'euler',
+          profile: bool = False,
+          verbose: bool = True,
+          dtype: np.dtype = np.float64) -> list[float]:
+    """Train controllers until an aircraft lands or the generation limit is reached
+
+    Args:
+        ga (GeneticAlgorithm): genetic algorithm
+        scenario (Scenario | ScenarioBatch): scenario(s) to train in
+        out_folder (str): folder to store the best controllers and run history in
+        episode_time (float, optional): initial episode duration [s]. Defaults to 30.0.
+        episode_time_step (float, optional): episode duration increase per generation [s].
+            Defaults to 1.0.
+        max_episode_time (float, optional): maximum episode duration [s]. Defaults to 85.0.
+        max_generations (int, optional): last generation to run. Defaults to 100.
+        dt (float, optional): fixed simulation timestep [s]. Defaults to DEFAULT_DT.
+        record_stride (int, optional): record the best path every stride steps. Defaults to 1.
+        record_top (int | None, optional): record by re-flying this many best controllers after
+            each episode, instead of recording all aircraft. Defaults to None.
+        viewer (Viewer | None, optional): live viewer to publish the fleet state to.
+            Defaults to None.
+        integrator (str, optional): fleet integrator ('euler', 'rk4' or 'adaptive').
+            Defaults to 'euler'.
+        profile (bool, optional): write the time spent per phase and generation to profile.csv.
+            Defaults to False.
+        verbose (bool, optional): print the best score of every generation. Defaults to True.
+        dtype (np.dtype, optional): floating point type of the genomes and simulation.
+            Defaults to np.float64.
+
+    Returns:
+        list[float]: best score per generation
+    """
+    population = ControllerBank.random(ga.population_size, dtype=dtype)
+    best_scores = []
+    timer = PhaseTimer(profile)
+    history = RunWriter(out_folder)
+
+    while True:
+        generation = ga.generation
+
+        # Simulate episode and calculate scores for each aircraft
+        snapshot = None
+        if viewer is not None:
+            snapshot = viewer.snapshot
+            snapshot.set_episode(generation, episode_time)
+        with timer.phase('rollout'):
+            result = ga.rollout(population, scenario, episode_time, dt,
+                                record_stride, record_top, snapshot, integrator)
+        scores = result.scores
+
+        # Save best controller
+        best = result.best
+        with timer.phase('checkpoint'):
+            population.save(os.path.join(out_folder, f'best_gen{generation}.npz'), best)
+        if verbose:
+            print(f'Generation {generation} best score: {scores[best]:.2f}')
+        best_scores.append(scores[best])
+        history.append(generation, episode_time, scores, result.landed, result.best_trajectory)
+
+        # Check if aircraft landed correctly
+        done = result.landed.any() or generation >= max_generations
+
+        # Create next generation
+        if not done:
+            with timer.phase('reproduction'):
+                population = ga.next_generation(population, scores)
+            episode_time = min(episode_time + episode_time_step, max_episode_time)
+
+        # Save phase timings
+        timer.end_generation(generation)
+        timer.save(os.path.join(out_folder, 'profile.csv'))
+        if done:
+            break
+
+    history.close()
+    return best_scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train aircraft controllers without visualization')
+    parser.add_argument('--population', type=int, default=200, help='population size')
+    parser.add_argument('--elite-fraction', type=float, default=0.05, help='elite fraction')
+    parser.add_argument('--mutation-rate', type=float, default=0.09, help='mutation rate')
+    parser.add_argument('--generations', type=int, default=100, help='maximum generation')
+    parser.add_argument('--episode-time', type=float, default=30.0, help='initial episode time [s]')
+    parser.add_argument('--episode-time-step', type=float, default=1.0,
+                        help='episode time increase per generation [s]')
+    parser.add_argument('--max-episode-time', type=float, default=85.0,
+                        help='maximum episode time [s]')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help='simulation timestep [s]')
+    parser.add_argument('--integrator', choices=INTEGRATORS, default='euler',
+                        help='integration scheme (rk4 and adaptive allow larger timesteps)')
+    parser.add_argument('--precision', choices=('float64', 'float32'), default='float64',
+                        help='floating point precision of the genomes and simulation '
+                             '(see precision.py for the drift of float32)')
+    parser.add_argument('--scenarios', type=int, default=1,
+                        help='number of scenarios to score each controller in (the default '
+                             'scenario and random variations of it)')
+    parser.add_argument('--aggregation', choices=AGGREGATIONS, default='mean',
+                        help='how to combine the scores over the scenarios')
+    parser.add_argument('--quantile', type=float, default=0.1,
+                        help='quantile of the quantile aggregation')
+    parser.add_argument('--record-stride', type=int, default=1,
+                        help='record trajectories every n steps')
+    parser.add_argument('--record-top', type=int, default=None,
+                        help='only record the n best individuals (by re-flying them)')
+    parser.add_argument('--viewer', action='store_true',
+                        help='show training live in a separate window')
+    parser.add_argument('--viewer-top', type=int, default=None,
+                        help='only draw the n aircraft that got furthest')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of rollout processes (0: one per CPU core)')
+    parser.add_argument('--cache-size', type=int, default=10000,
+                        help='number of scores to cache for unchanged individuals (0: no cache)')
+    parser.add_argument('--profile', action='store_true',
+                        help='write the time spent per phase to profile.csv')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--out', default=os.path.join('out', time.strftime('%Y%m%d-%H%M%S')),
+                        help='output folder')
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    os.makedirs(args.out, exist_ok=True)
+
+    ga = GeneticAlgorithm(population_size=args.population,
+                          elite_fraction=args.elite_fraction,
+                          mutation_rate=args.mutation_rate,
+                          workers=args.workers or os.cpu_count(),
+                          cache_size=args.cache_size)
+    if args.scenarios > 1:
+        scenario = random_scenarios(args.scenarios, args.seed, args.aggregation, args.quantile)
+        terrain = scenario.scenarios[0].terrain
+    else:
+        scenario = default_scenario()
+        terrain = scenario.terrain
+    viewer = Viewer(terrain, ga.population_size, args.viewer_top) if args.viewer else None
+    try:
+        train(ga, scenario, args.out,
+              episode_time=args.episode_time,
+              episode_time_step=args.episode_time_step,
+              max_episode_time=args.max_episode_time,
+              max_generations=args.generations,
+              dt=args.dt,
+              record_stride=args.record_stride,
+              record_top=args.record_top,
+              viewer=viewer,
+              integrator=args.integrator,
+              profile=args.profile,
+              dtype=np.dtype(args.precision))
+    finally:
+        ga.close()
+        if viewer is not None:
+            viewer.close()
+
+
+if __name__ == '__main__':
+    main()
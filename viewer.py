@@ -0,0 +1,274 @@
+"""Live training visualization in a separate process"""
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+
+import multiprocessing as mp
+import time
+
+import numpy as np
+import pygame as pg
+
+from multiprocessing.shared_memory import SharedMemory
+
+from fleet import AircraftFleet
+from render import AircraftRenderer, TerrainRenderer
+from terrain import Terrain
+
+
+class FleetSnapshot:
+    """Fleet state in shared memory, written by the simulation and read by the viewer
+
+    Writers never wait for the viewer and the viewer takes whatever is in the buffer, so a frame may
+    mix aircraft from consecutive steps. That is harmless for visualization and keeps the simulation
+    independent of the viewer. Snapshots can be pickled to worker processes, which then write their
+    own shard of the fleet (starting at offset). A writer for a subset of the population maps its
+    aircraft to their population rows.
+    """
+
+    HEADER = 3  # generation, simulation time [s], episode time [s]
+
+    def __init__(self, size: int, name: str | None = None, offset: int = 0,
+                 publish_rate: float = 60.0, rows: np.ndarray | None = None) -> None:
+        """Create (or attach to) a snapshot buffer
+
+        Args:
+            size (int): number of aircraft
+            name (str | None, optional): name of an existing buffer to attach to. Defaults to None.
+            offset (int, optional): index of the first aircraft written by this process. Defaults to 0.
+            publish_rate (float, optional): maximum number of writes per second. Defaults to 60.0.
+            rows (np.ndarray | None, optional): population row of each aircraft written by this
+                writer (aircraft i of the fleet goes to rows[offset + i]). Defaults to None
+                (aircraft i goes to row offset + i).
+        """
+        self.size: int = size
+        self.offset: int = offset
+        self.rows: np.ndarray | None = rows
+        self.publish_rate: float = publish_rate
+        self._last_publish: float = -np.inf
+
+        nbytes = 8 * self.HEADER + size * (8 * 2 + 8 + 1 + 3)
+        self._owner: bool = name is None
+        self._shm: SharedMemory = SharedMemory(name=name, create=self._owner, size=nbytes)
+
+        buffer = self._shm.buf
+        offset = 0
+        self.header: np.ndarray = np.ndarray((self.HEADER,), np.float64, buffer, offset)
+        offset += 8 * self.HEADER
+        self.pos: np.ndarray = np.ndarray((size, 2), np.float64, buffer, offset)
+        offset += 16 * size
+        self.pitch: np.ndarray = np.ndarray((size,), np.float64, buffer, offset)
+        offset += 8 * size
+        self.alive: np.ndarray = np.ndarray((size,), np.bool_, buffer, offset)
+        offset += size
+        self.colors: np.ndarray = np.ndarray((size, 3), np.uint8, buffer, offset)
+
+    @property
+    def name(self) -> str:
+        """Get the name of the shared memory buffer
+
+        Returns:
+            str: buffer name
+        """
+        return self._shm.name
+
+    def __getstate__(self) -> dict:
+        return {'size': self.size, 'name': self.name, 'offset': self.offset,
+                'publish_rate': self.publish_rate, 'rows': self.rows}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def shard(self, offset: int) -> "FleetSnapshot":
+        """Get a writer for a shard of the fleet
+
+        Args:
+            offset (int): index of the first aircraft of the shard
+
+        Returns:
+            FleetSnapshot: snapshot attached to the same buffer
+        """
+        return FleetSnapshot(self.size, self.name, offset, self.publish_rate, self.rows)
+
+    def subset(self, indices: np.ndarray) -> "FleetSnapshot":
+        """Get a writer for a subset of the aircraft of this writer (e.g. the uncached controllers)
+
+        Args:
+            indices (np.ndarray): indices of the aircraft within this writer
+
+        Returns:
+            FleetSnapshot: snapshot attached to the same buffer, writing aircraft i of its fleet to
+                the row of aircraft indices[i]
+        """
+        rows = np.arange(self.size)[self._targets(slice(None))]
+        return FleetSnapshot(self.size, self.name, 0, self.publish_rate, rows[indices])
+
+    def _targets(self, aircraft: slice) -> np.ndarray | slice:
+        """Get the buffer rows of a range of the aircraft of this writer
+
+        Args:
+            aircraft (slice): aircraft range (relative to offset)
+
+        Returns:
+            np.ndarray | slice: buffer rows
+        """
+        if self.rows is None:
+            start, stop, _ = aircraft.indices(self.size - self.offset)
+            return slice(self.offset + start, self.offset + stop)
+        return self.rows[self.offset:][aircraft]
+
+    def hide(self, indices: np.ndarray) -> None:
+        """Mark aircraft of this writer as not alive (e.g. controllers that are not flown)
+
+        Args:
+            indices (np.ndarray): indices of the aircraft within this writer
+        """
+        rows = np.arange(self.size)[self._targets(slice(None))]
+        self.alive[rows[indices]] = False
+
+    def set_episode(self, generation: int, episode_time: float) -> None:
+        """Set the generation and episode duration shown by the viewer
+
+        Args:
+            generation (int): generation number
+            episode_time (float): episode duration [s]
+        """
+        self.header[0] = generation
+        self.header[2] = episode_time
+
+    def publish(self, fleet: AircraftFleet, sim_time: float, count: int | None = None) -> None:
+        """Write the fleet state, unless the last write was less than 1 / publish_rate ago
+
+        Args:
+            fleet (AircraftFleet): fleet (or fleet shard) to write
+            sim_time (float): simulation time [s]
+            count (int | None, optional): only write the first count aircraft. Defaults to None
+                (all aircraft).
+        """
+        now = time.perf_counter()
+        if now - self._last_publish < 1 / self.publish_rate:
+            return
+        self._last_publish = now
+
+        count = len(fleet) if count is None else count
+        shard = self._targets(slice(0, count))
+        self.pos[shard] = fleet.pos[:count]
+        self.pitch[shard] = fleet.pitch[:count]
+        self.alive[shard] = ~fleet.crashed[:count]
+        self.colors[shard] = fleet.colors[:count]
+        self.header[1] = sim_time
+
+    def read(self) -> dict[str, np.ndarray]:
+        """Copy the current state out of the buffer
+
+        Returns:
+            dict[str, np.ndarray]: header, positions, pitch angles, alive flags and colors
+        """
+        return {'header': self.header.copy(), 'pos': self.pos.copy(), 'pitch': self.pitch.copy(),
+                'alive': self.alive.copy(), 'colors': self.colors.copy()}
+
+    def close(self) -> None:
+        """Detach from the buffer (and remove it, if this process created it)"""
+        if self._shm is None:
+            return
+        del self.header, self.pos, self.pitch, self.alive, self.colors
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __del__(self) -> None:
+        if getattr(self, '_shm', None) is not None:
+            self.close()
+
+
+def run_viewer(name: str, size: int, terrain: Terrain, top_n: int | None, fps: int) -> None:
+    """Show the fleet state of a snapshot buffer until the window is closed
+
+    Args:
+        name (str): name of the snapshot buffer
+        size (int): number of aircraft
+        terrain (Terrain): terrain to draw
+        top_n (int | None): only draw this many aircraft with the largest x-positions (if given)
+        fps (int): frame rate of the viewer
+    """
+    snapshot = FleetSnapshot(size, name)
+
+    # Initialize PyGame
+    pg.init()
+    screen = pg.display.set_mode((1200, 800), pg.RESIZABLE)
+    clock = pg.time.Clock()
+    camera_pos = np.array([0.0, 150.0])
+    font = pg.font.Font(None, 24)
+    pg.display.set_caption('Aircraft training viewer')
+    terrain_renderer = TerrainRenderer(terrain)
+    aircraft_renderer = AircraftRenderer()
+
+    running = True
+    while running:
+        clock.tick(fps)
+        state = snapshot.read()
+        generation, sim_time, episode_time = state['header']
+        pos = state['pos']
+
+        # Select aircraft to draw (level of detail: only the furthest aircraft)
+        alive = np.flatnonzero(state['alive'])
+        if top_n is not None and alive.size > top_n:
+            alive = alive[np.argpartition(-pos[alive, 0], top_n - 1)[:top_n]]
+
+        # Update camera position (follow best aircraft)
+        if alive.size > 0:
+            max_x = pos[alive, 0].max()
+            camera_pos = np.array([min(max_x, terrain.runways[1][1]), camera_pos[1]])
+
+        # Draw terrain and aircraft
+        screen.fill((135, 206, 235))
+        terrain_renderer.draw(screen, camera_pos)
+        aircraft_renderer.draw(screen, camera_pos, pos[alive], state['pitch'][alive],
+                               state['colors'][alive], font, alive)
+
+        # Draw FPS and training progress
+        lines = [f'FPS: {clock.get_fps():.0f}',
+                 f'No. of aircraft: {state["alive"].sum()} ({alive.size} drawn)',
+                 f'Generation: {generation:.0f}',
+                 f'Time: {sim_time:.1f}/{episode_time:.1f} s']
+        for i, line in enumerate(lines):
+            screen.blit(font.render(line, True, (0, 0, 0)), (10, 10 + 20 * i))
+
+        # Handle events
+        pg.display.flip()
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                running = False
+            if event.type == pg.VIDEORESIZE:
+                screen = pg.display.set_mode((event.w, event.h), pg.RESIZABLE)
+
+    pg.quit()
+    snapshot.close()
+
+
+class Viewer:
+    """Live viewer of a training run, running in its own process"""
+
+    def __init__(self, terrain: Terrain, size: int, top_n: int | None = None, fps: int = 30,
+                 publish_rate: float = 60.0) -> None:
+        """Create the snapshot buffer and start the viewer process
+
+        Args:
+            terrain (Terrain): terrain to draw
+            size (int): number of aircraft (population size)
+            top_n (int | None, optional): only draw this many aircraft with the largest
+                x-positions. Defaults to None (draw all aircraft).
+            fps (int, optional): frame rate of the viewer. Defaults to 30.
+            publish_rate (float, optional): maximum snapshot writes per second. Defaults to 60.0.
+        """
+        self.snapshot: FleetSnapshot = FleetSnapshot(size, publish_rate=publish_rate)
+        self.process: mp.Process = mp.Process(target=run_viewer, daemon=True,
+                                              args=(self.snapshot.name, size, terrain, top_n, fps))
+        self.process.start()
+
+    def close(self) -> None:
+        """Stop the viewer process and remove the snapshot buffer"""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.snapshot.close()